@@ -1,49 +1,61 @@
-from flask import Flask, render_template, request, session, jsonify
+from flask import Flask, render_template, request, session, jsonify, url_for, redirect, Response
 from shot import (
-    simulate_ball,
-    get_dropdown_data,
     get_shot_rating,
     calculate_effective_score,
-    SHOT_MAX_RUNS
+    get_outcome_from_effective_score,
+    score_all_shots,
+    score_sheet,
+    OUTCOMES
 )
-import random
+from teams import CSK_PLAYERS, MI_PLAYERS
+from stats import MatchStats
+from match_engine import pick_weak_shot_balls, choose_shot, BOT_BOWLER_RATING
+from match_store import MatchSessionInterface, store_from_config, web_workers
+from commentary import CommentaryLog, COMMENTARY_CAPACITY, generate_commentary
+from win_probability import WinProbabilityService, match_state
+from snapshots import RatingSnapshots, SnapshotExpired
+from spectator import SpectatorPublisher
+from toss import TossModel, CONDITIONS as TOSS_CONDITIONS
+import replay
+import metrics
+import os
+import secrets
+from itertools import product
+import numpy as np
 
 app = Flask(__name__)
 app.secret_key = "ipl_engine"
 
-# ----------------------------
-# TEAM DATA
-# ----------------------------
+# Match state lives server side (MATCH_STORE=sqlite:<path>, the default
+# sqlite:matches.db, or memory for a single worker), the cookie only holds
+# a signed match id
+app.session_interface = MatchSessionInterface(store_from_config())
+
+# Opt-in hot path timings on /metrics (METRICS=1), the wrappers below
+# hand back the plain functions when it is off
+metrics.init_app(app)
+get_shot_rating = metrics.instrument("rating_lookup", get_shot_rating)
+score_all_shots = metrics.instrument("rating_lookup", score_all_shots)
+
+# Ratings with their dropdown data, combinations and bowling strategy.
+# New matches take the current snapshot and keep it to the end, a watcher
+# swaps in a new one when the workbook changes (RATINGS_RELOAD_INTERVAL
+# seconds between checks, 0 turns it off)
+rating_snapshots = RatingSnapshots.from_config()
+
+# Monte Carlo estimates run in a process pool fed from a background thread,
+# the CPUs are split between the gunicorn workers so each has its own share
+win_probability = WinProbabilityService(
+    workers=max(1, (os.cpu_count() or 1) // web_workers())
+)
+
+# Toss decisions for every condition combination, reloaded when
+# toss_payoffs.json (or $TOSS_PAYOFFS) changes
+toss_model = TossModel()
 
-CSK_PLAYERS = [
-    {"name": "Ruturaj Gaikwad", "bat": 90, "bowl": 0},
-    {"name": "Devon Conway", "bat": 88, "bowl": 0},
-    {"name": "Ajinkya Rahane", "bat": 86, "bowl": 0},
-    {"name": "Shivam Dube", "bat": 77, "bowl": 70},
-    {"name": "Ravindra Jadeja", "bat": 75, "bowl": 85},
-    {"name": "MS Dhoni", "bat": 80, "bowl": 0},
-    {"name": "Moeen Ali", "bat": 70, "bowl": 78},
-    {"name": "Deepak Chahar", "bat": 65, "bowl": 92},
-    {"name": "Maheesh Theekshana", "bat": 60, "bowl": 90},
-    {"name": "Tushar Deshpande", "bat": 60, "bowl": 88},
-    {"name": "Matheesha Pathirana", "bat": 60, "bowl": 90},
-]
-
-MI_PLAYERS = [
-    {"name": "Rohit Sharma", "bat": 80, "bowl": 0},
-    {"name": "Ishan Kishan", "bat": 71, "bowl": 0},
-    {"name": "Suryakumar Yadav", "bat": 80, "bowl": 0},
-    {"name": "Tilak Varma", "bat": 81, "bowl": 0},
-    {"name": "Hardik Pandya", "bat": 75, "bowl": 75},
-    {"name": "Tim David", "bat": 70, "bowl": 65},
-    {"name": "Jasprit Bumrah", "bat": 60, "bowl": 99},
-    {"name": "Gerald Coetzee", "bat": 60, "bowl": 85},
-    {"name": "Piyush Chawla", "bat": 50, "bowl": 80},
-    {"name": "Akash Madhwal", "bat": 60, "bowl": 81},
-    {"name": "Naman Dhir", "bat": 75, "bowl": 0},
-]
-
-dropdown_data = get_dropdown_data()
+# Live matches are forwarded to the spectator server when SPECTATOR_URL is
+# set, SPECTATOR_TOKEN must then be set to the server's token
+spectators = SpectatorPublisher.from_config()
 
 # ----------------------------
 # HELPER FUNCTIONS
@@ -52,141 +64,105 @@ dropdown_data = get_dropdown_data()
 def get_overs_display(balls):
     return f"{balls // 6}.{balls % 6}"
 
-def get_outcome_from_effective_score(effective_score, line, length, shot_type):
-    """Use simulate_ball logic for consistent results"""
-    max_runs = SHOT_MAX_RUNS.get(shot_type, 4)
-
-    # Defense & Leave always dot
-    if max_runs == 0:
-        return 0
-
-    # Very High
-    if effective_score >= 98:
-        if max_runs == 6:
-            return 6
-        else:
-            return 4
-
-    # High
-    if 85 <= effective_score < 98:
-        return 4
-
-    # Medium
-    if 75 <= effective_score < 85:
-        return 2
-
-    # Low Case - wicket check
-    stump_lines = ["Off Stump", "Middle Stump", "Leg Stump"]
-    if line in stump_lines and length in ["Yorker", "Good Length", "Full"]:
-        wicket_roll = random.randint(1, 100)
-        if wicket_roll > effective_score:
-            return "W"
-
-    return 0
-
-def get_all_valid_combinations():
-    """Get all valid (line, length, variation) combinations from Excel"""
-    combinations = []
-    for bowling_type in dropdown_data.keys():
-        sheet = dropdown_data[bowling_type]
-        for line in sheet["lines"]:
-            for length in sheet["lengths"]:
-                for variation in sheet["variations"]:
-                    combinations.append((bowling_type, line, length, variation))
-    return combinations
-
-def ai_choose_ball():
-    """Choose a random valid bowling combination"""
-    valid_combinations = get_all_valid_combinations()
-    if not valid_combinations:
+def match_rng(stream, *keys):
+    """Generator for one decision of this match, see replay.match_rng"""
+    return replay.match_rng(session["seed"], stream, *keys)
+
+def next_ball_rng(stream):
+    return match_rng(stream, session["innings"], session["balls"] + 1)
+
+def match_snapshot():
+    """Ratings this match started on, the current ones outside a match"""
+    return rating_snapshots.get(session.get("ratings_version"))
+
+@metrics.instrument("ai_choice")
+def ai_choose_ball(batsman=None):
+    """Choose a bowling combination, from the solved strategy table if the mode uses one"""
+    rng = next_ball_rng("bowl")
+    snapshot = match_snapshot()
+    # Solved offline by bowling_strategy.py, None falls back to random bowling
+    if batsman is not None and snapshot.strategy is not None:
+        delivery = snapshot.strategy.choose(session.get("mode"), batsman["bat"], rng)
+        # A stale table kept across a reload may name removed deliveries
+        if delivery is not None and snapshot.has_delivery(delivery):
+            return delivery
+
+    if not len(snapshot.combinations):
         # Fallback to first combination if none found
-        bowling_type = list(dropdown_data.keys())[0]
-        sheet = dropdown_data[bowling_type]
+        bowling_type = list(snapshot.dropdown_data.keys())[0]
+        sheet = snapshot.dropdown_data[bowling_type]
         return bowling_type, sheet["lines"][0], sheet["lengths"][0], sheet["variations"][0]
     
-    bowling_type, line, length, variation = random.choice(valid_combinations)
+    bowling_type, line, length, variation = snapshot.combinations.sample(rng)
     return bowling_type, line, length, variation
 
 def initialize_weak_shot_balls():
     """Initialize which balls should pick weak shots"""
-    total_balls = session["overs"] * 6
-    mode = session["mode"]
-    
-    if mode == "easy":
-        weak_percentage = 0.15  # 15%
-    elif mode == "medium":
-        weak_percentage = 0.08  # 8%
-    else:  # hard
-        weak_percentage = 0.03  # 3%
-    
-    num_weak_balls = max(1, int(total_balls * weak_percentage))
-    
-    # Randomly select which ball numbers should pick weak shots
-    weak_ball_numbers = random.sample(range(total_balls), num_weak_balls)
-    session["weak_shot_balls"] = weak_ball_numbers
+    session["weak_shot_balls"] = pick_weak_shot_balls(
+        session["overs"],
+        session["mode"],
+        match_rng("weak", session["innings"])
+    )
 
-def ai_choose_shot_by_mode(batsman, bowling_type, line, length, variation, mode):
+@metrics.instrument("ai_choice")
+def ai_choose_shot_by_mode(batsman, bowling_type, line, length, variation, mode,
+                           stream="shot"):
     """Choose shot based on mode and ball number"""
-    
-    shots = dropdown_data[bowling_type]["shots"]
-    shot_scores = []
+    return choose_shot(
+        batsman,
+        bowling_type,
+        line,
+        length,
+        variation,
+        mode,
+        session["balls"],
+        session.get("weak_shot_balls", []),
+        next_ball_rng(stream),
+        match_snapshot().ratings
+    )
 
-    for shot in shots:
-        shot_rating = get_shot_rating(bowling_type, line, length, variation, shot)
-        effective = calculate_effective_score(
-            batsman["bat"],
-            75,
-            shot_rating
-        )
-        shot_scores.append((shot, effective))
+def publish_to_spectators(event, data):
+    # Channels use their own public id, never the session key
+    if spectators and session.get("spectator_id"):
+        spectators.publish(session["spectator_id"], event, data, title="CSK (player) vs MI")
 
-    shot_scores.sort(key=lambda x: x[1])  # Sort by score (lowest to highest)
+def innings_over():
+    return session["balls"] >= session["overs"] * 6 or session["wickets"] >= 10
 
-    # Check if current ball should pick a weak shot
-    current_ball = session["balls"]
-    weak_ball_numbers = session.get("weak_shot_balls", [])
-    
-    if current_ball in weak_ball_numbers:
-        # Pick a weak shot (from lower 1/3)
-        idx = random.randint(0, len(shot_scores)//3) if len(shot_scores)//3 > 0 else 0
-        return shot_scores[idx]
-    else:
-        # Pick a strong shot based on mode
-        if mode == "easy":
-            # Pick from middle 1/3 of good shots
-            start_idx = len(shot_scores) * 2 // 3
-            end_idx = len(shot_scores)
-            idx = random.randint(start_idx, end_idx - 1) if start_idx < end_idx else end_idx - 1
-        elif mode == "medium":
-            # Pick from upper 1/3 (good shots)
-            start_idx = len(shot_scores) * 2 // 3
-            end_idx = len(shot_scores)
-            idx = random.randint(start_idx, end_idx - 1) if start_idx < end_idx else end_idx - 1
-        else:  # hard
-            # Pick from top best shots
-            start_idx = len(shot_scores) * 2 // 3
-            end_idx = len(shot_scores)
-            idx = random.randint(start_idx, end_idx - 1) if start_idx < end_idx else end_idx - 1
-        
-        return shot_scores[idx]
+def render_match(runs, wickets, overs_display, commentary,
+                 current_batsman, current_bowler):
+    """Render match.html, the full dropdown data is fetched separately"""
+    snapshot = match_snapshot()
+    dropdown_data = snapshot.dropdown_data
+    first_bowling_type = list(dropdown_data.keys())[0]
+    first_sheet = dropdown_data[first_bowling_type]
 
-def generate_commentary(batsman, bowler, result):
-    if result == "W":
-        return f"OUT! {batsman} dismissed by {bowler}!"
-    if result == 6:
-        return f"SIX by {batsman}!"
-    if result == 4:
-        return f"FOUR by {batsman}!"
-    if result == 2:
-        return f"{batsman} scores 2 runs."
-    if result == 1:
-        return f"Single taken by {batsman}."
-    return f"{batsman} plays a dot ball."
+    return render_template("match.html",
+                           runs=runs,
+                           wickets=wickets,
+                           overs_display=overs_display,
+                           bowling_types=list(dropdown_data.keys()),
+                           first_bowling_type=first_bowling_type,
+                           first_sheet=first_sheet,
+                           commentary=commentary,
+                           commentary_capacity=COMMENTARY_CAPACITY,
+                           dropdown_url=url_for("dropdown_data_asset", v=snapshot.dropdown_version),
+                           current_batsman=current_batsman,
+                           current_bowler=current_bowler)
 
 # ----------------------------
 # ROUTES
 # ----------------------------
 
+@app.errorhandler(SnapshotExpired)
+def match_ratings_expired(error):
+    """End a match whose ratings were unloaded rather than switch ratings mid-match"""
+    session.clear()
+    if request.accept_mimetypes.best == "text/html":
+        return redirect(url_for("index"))
+    return jsonify({"error": "The ratings this match was playing on are no longer "
+                             "loaded, start a new match"}), 409
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -199,6 +175,11 @@ def toss():
     session["team"] = request.form.get("team")
     session["overs"] = int(request.form.get("overs"))
     session["mode"] = request.form.get("mode")
+
+    # Every random choice of the match derives from this seed, a numeric
+    # ?seed= replays a match exactly
+    seed = request.values.get("seed", "")
+    session["seed"] = int(seed) if seed.isdigit() else secrets.randbits(63)
     
     return render_template("toss.html")
 
@@ -206,77 +187,17 @@ def toss():
 @app.route("/calculate_toss", methods=["POST"])
 def calculate_toss():
     """Calculate toss result and optimal decision using game theory"""
-    import random
-    
     # Get toss call
     toss_call = request.form.get("toss_call")
-    coin_result = random.choice(["Heads", "Tails"])
+    coin_result = match_rng("toss").choice(["Heads", "Tails"])
     
     # Determine toss winner
     toss_winner = "You" if toss_call == coin_result else "Opponent"
     
-    # Get match conditions
-    time = request.form.get("time")
-    dew = request.form.get("dew")
-    pitch = request.form.get("pitch")
-    rain = request.form.get("rain")
-    humidity = request.form.get("humidity")
-    turn = request.form.get("turn")
-    ground = request.form.get("ground")
-    
-    # Payoff matrix
-    matrix = {
-        "Afternoon Match": (65, 35),
-        "Night Match": (30, 70),
-        "High Dew": (25, 75),
-        "No Dew": (60, 40),
-        "Dry Pitch": (60, 40),
-        "Green Pitch": (35, 65),
-        "Rain Affected": (40, 60),
-        "No Rain": (55, 45),
-        "High Humidity": (30, 70),
-        "Normal Humidity": (50, 50),
-        "Slow Turning Pitch": (60, 40),
-        "Fast Pitch": (45, 55),
-        "Small Ground": (35, 65),
-        "Large Ground": (60, 40)
-    }
-    
-    conditions = [time, pitch, ground, dew, rain, humidity, turn]
-    
-    bat_total = 0
-    bowl_total = 0
-    
-    for cond in conditions:
-        if cond in matrix:
-            bat, bowl = matrix[cond]
-            bat_total += bat
-            bowl_total += bowl
-    
-    # Calculate probabilities
-    bat_prob = bat_total / len(conditions)
-    bowl_prob = bowl_total / len(conditions)
-    
-    # Apply bonuses for pitch knowledge
-    if "Dry" in pitch or "Slow" in turn:
-        bat_prob += 5
-    if "Green" in pitch or "High Dew" in dew:
-        bowl_prob += 5
-    
-    # Toss advantage
-    if toss_winner == "You":
-        if bat_prob > bowl_prob:
-            bat_prob += 3
-        else:
-            bowl_prob += 3
-    
-    # Normalize
-    total = bat_prob + bowl_prob
-    bat_percentage = round((bat_prob / total) * 100, 1)
-    bowl_percentage = round((bowl_prob / total) * 100, 1)
-    
-    # Determine optimal decision
-    optimal_decision = "BAT" if bat_prob > bowl_prob else "BOWL"
+    # Precomputed for every combination of the dropdowns
+    conditions = [request.form.get(field) for field in TOSS_CONDITIONS]
+    bat_percentage, bowl_percentage, optimal_decision = toss_model.decide(
+        conditions, toss_winner == "You")
     
     # Store in session
     session["toss_winner"] = toss_winner
@@ -292,12 +213,38 @@ def calculate_toss():
                           bat_percentage=bat_percentage,
                           bowl_percentage=bowl_percentage,
                           optimal_decision=optimal_decision)
+
+@app.route("/toss_table")
+def toss_table():
+    """Toss decision for every condition combination and toss result"""
+    return jsonify(toss_model.rows())
+
+def dropdown_response(body, etag, snapshot):
+    """JSON cached for good under a ?v= dropdown version, else revalidated by ETag"""
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    if request.args.get("v") == snapshot.dropdown_version:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route("/dropdown_data.json")
+def dropdown_data_asset():
+    """Dropdown data for every sheet, cacheable for as long as it is versioned"""
+    snapshot = rating_snapshots.find_dropdown(request.args.get("v")) or match_snapshot()
+    return dropdown_response(snapshot.dropdown_json, snapshot.dropdown_version, snapshot)
+
 @app.route("/get_sheet_data/<bowling_type>")
 def get_sheet_data(bowling_type):
-    """Return dropdown data for a specific bowling type"""
-    if bowling_type in dropdown_data:
-        return jsonify(dropdown_data[bowling_type])
-    return jsonify({"error": "Bowling type not found"}), 404
+    """Dropdown data for one bowling type, cached like /dropdown_data.json"""
+    snapshot = rating_snapshots.find_dropdown(request.args.get("v")) or match_snapshot()
+    if bowling_type not in snapshot.dropdown_data:
+        return jsonify({"error": "Bowling type not found"}), 404
+    body, etag = snapshot.sheet_payload(bowling_type)
+    return dropdown_response(body, etag, snapshot)
 
 @app.route("/start", methods=["POST"])
 def start():
@@ -305,6 +252,8 @@ def start():
     decision = request.form.get("decision")
     overs = session.get("overs")
     mode = session.get("mode")
+    if decision not in replay.DECISIONS:
+        return jsonify({"error": "Choose to bat or bowl"}), 400
 
     session["decision"] = decision
     session["balls"] = 0
@@ -312,7 +261,18 @@ def start():
     session["wickets"] = 0
     session["innings"] = 1
     session["target"] = None
-    session["commentary"] = []
+    session["commentary"] = CommentaryLog()
+    # A new channel per match, viewers of the last one saw it end
+    session["spectator_id"] = secrets.token_urlsafe(8)
+
+    # The whole match is played on the ratings current now. Only the
+    # version goes in the session, the snapshot is looked up per request
+    snapshot = rating_snapshots.current
+    session["ratings_version"] = snapshot.version
+    session["replay"] = replay.new_log(session["seed"], overs, mode, decision,
+                                       snapshot.version)
+    session["stats"] = MatchStats({"CSK": CSK_PLAYERS, "MI": MI_PLAYERS},
+                                  snapshot.combinations)
     
     # Initialize stored bowling choice variables
     session["stored_bowling_type"] = None
@@ -323,29 +283,50 @@ def start():
     # Initialize weak shot ball numbers for this innings
     initialize_weak_shot_balls()
 
-    # Get first bowling type for initialization
-    first_bowling_type = list(dropdown_data.keys())[0]
-    first_sheet = dropdown_data[first_bowling_type]
-
-    return render_template("match.html",
-                           runs=0,
-                           wickets=0,
-                           overs_display="0.0",
-                           data=dropdown_data,
-                           first_bowling_type=first_bowling_type,
-                           first_sheet=first_sheet,
-                           commentary=[],
-                           current_batsman="Ruturaj Gaikwad",
-                           current_bowler="Jasprit Bumrah")
+    return render_match(runs=0,
+                        wickets=0,
+                        overs_display="0.0",
+                        commentary=[],
+                        current_batsman="Ruturaj Gaikwad",
+                        current_bowler="Jasprit Bumrah")
 
 @app.route("/play_ball", methods=["POST"])
 def play_ball():
 
-    total_balls = session["overs"] * 6
-
-    if session["balls"] >= total_balls or session["wickets"] >= 10:
+    if innings_over():
         return change_innings()
 
+    ball = play_one_ball(request.form)
+
+    return render_match(runs=session["runs"],
+                        wickets=session["wickets"],
+                        overs_display=get_overs_display(session["balls"]),
+                        commentary=session["commentary"].latest(),
+                        current_batsman=ball["current_batsman"],
+                        current_bowler=ball["current_bowler"])
+
+@app.route("/api/ball", methods=["POST"])
+def api_ball():
+    """Play a ball and return only what changed on the match page"""
+    if innings_over():
+        # The client falls back to /play_ball for the innings change page
+        return jsonify({"innings_over": True})
+
+    ball = play_one_ball(request.form)
+
+    return jsonify({
+        "innings_over": False,
+        "runs": session["runs"],
+        "wickets": session["wickets"],
+        "overs_display": get_overs_display(session["balls"]),
+        "current_batsman": ball["current_batsman"],
+        "current_bowler": ball["current_bowler"],
+        "ball": ball["ball"],
+        "comment": ball["comment"]
+    })
+
+def play_one_ball(form):
+    """Play the next ball from the posted form and update the session"""
     user_is_batting = (
         (session["innings"] == 1 and session["decision"] == "bat") or
         (session["innings"] == 2 and session["decision"] == "bowl")
@@ -364,10 +345,11 @@ def play_ball():
                            key=lambda x: x["bowl"], reverse=True)
     current_bowler = bowling_order[over_no % len(bowling_order)]
 
-    show_score = request.form.get("show_score")
+    show_score = form.get("show_score")
+    snapshot = match_snapshot()
 
     if user_is_batting:
-        shot = request.form.get("shot")
+        shot = form.get("shot")
         
         # USE THE STORED BOWLING CHOICE from /get_effective_scores
         bowling_type = session.get("stored_bowling_type")
@@ -377,21 +359,23 @@ def play_ball():
         
         # If not stored (shouldn't happen), generate new one
         if not bowling_type:
-            bowling_type, line, length, variation = ai_choose_ball()
+            bowling_type, line, length, variation = ai_choose_ball(current_batsman)
         
-        shot_rating = get_shot_rating(bowling_type, line, length, variation, shot)
+        shot_rating = get_shot_rating(bowling_type, line, length, variation, shot,
+                                      snapshot.ratings)
         effective = calculate_effective_score(
             current_batsman["bat"],
             current_bowler["bowl"],
             shot_rating
         )
     else:
-        bowling_type = request.form.get("bowling_type")
-        line = request.form.get("line")
-        length = request.form.get("length")
-        variation = request.form.get("variation")
+        bowling_type = form.get("bowling_type")
+        line = form.get("line")
+        length = form.get("length")
+        variation = form.get("variation")
         
         # Sync dropdowns: validate and correct if needed
+        dropdown_data = snapshot.dropdown_data
         if bowling_type not in dropdown_data:
             bowling_type = list(dropdown_data.keys())[0]
         
@@ -412,16 +396,36 @@ def play_ball():
             session["mode"]
         )
 
-    max_runs = 6
-    result = get_outcome_from_effective_score(effective, line, length, shot)
+    # Outcome rolls have their own stream, bot choice changes never move them
+    result = get_outcome_from_effective_score(effective, line, length, shot,
+                                              next_ball_rng("outcome"))
 
     session["balls"] += 1
 
+    replay.append_ball(
+        session["replay"],
+        session["innings"],
+        session["balls"],
+        (bowling_type, line, length, variation),
+        shot,
+        current_batsman["bat"],
+        current_bowler["bowl"] if user_is_batting else BOT_BOWLER_RATING,
+        effective,
+        replay.wicket_roll(session["seed"], session["innings"], session["balls"]),
+        result,
+        snapshot.combinations,
+        snapshot.ratings
+    )
+
     if result == "W":
         session["wickets"] += 1
     else:
         session["runs"] += result
 
+    session["stats"].add_ball(current_batsman["name"], current_bowler["name"],
+                              (bowling_type, line, length, variation), result,
+                              snapshot.combinations)
+
     comment = generate_commentary(
         current_batsman["name"],
         current_bowler["name"],
@@ -437,7 +441,19 @@ def play_ball():
     if show_score:
         comment += f" (Effective Score: {effective})"
 
-    session["commentary"].insert(0, comment)
+    session["commentary"].add(comment)
+
+    publish_to_spectators("ball", {
+        "innings": session["innings"],
+        "ball": session["balls"],
+        "overs": get_overs_display(session["balls"]),
+        "runs": session["runs"],
+        "wickets": session["wickets"],
+        "batsman": current_batsman["name"],
+        "bowler": current_bowler["name"],
+        "result": result,
+        "comment": comment
+    })
 
     # ✅ CLEAR THE STORED BOWLING CHOICE FOR NEXT BALL
     session["stored_bowling_type"] = None
@@ -446,20 +462,12 @@ def play_ball():
     session["stored_variation"] = None
     session.modified = True
 
-    # Get first bowling type for next render
-    first_bowling_type = list(dropdown_data.keys())[0]
-    first_sheet = dropdown_data[first_bowling_type]
-
-    return render_template("match.html",
-                           runs=session["runs"],
-                           wickets=session["wickets"],
-                           overs_display=get_overs_display(session["balls"]),
-                           data=dropdown_data,
-                           first_bowling_type=first_bowling_type,
-                           first_sheet=first_sheet,
-                           commentary=session["commentary"],
-                           current_batsman=current_batsman["name"],
-                           current_bowler=current_bowler["name"])
+    return {
+        "ball": session["balls"],
+        "comment": comment,
+        "current_batsman": current_batsman["name"],
+        "current_bowler": current_bowler["name"]
+    }
 
 def change_innings():
 
@@ -469,36 +477,30 @@ def change_innings():
         session["balls"] = 0
         session["wickets"] = 0
         session["innings"] = 2
-        session["commentary"] = []
+        session["commentary"] = CommentaryLog()
         
         # Initialize weak shot ball numbers for 2nd innings
         initialize_weak_shot_balls()
+        publish_to_spectators("innings", {"innings": 2, "target": session["target"]})
         
-        first_bowling_type = list(dropdown_data.keys())[0]
-        first_sheet = dropdown_data[first_bowling_type]
-        
-        return render_template("match.html",
-                               runs=0,
-                               wickets=0,
-                               overs_display="0.0",
-                               data=dropdown_data,
-                               first_bowling_type=first_bowling_type,
-                               first_sheet=first_sheet,
-                               commentary=[],
-                               current_batsman="Opponent",
-                               current_bowler="CSK Bowler")
+        return render_match(runs=0,
+                            wickets=0,
+                            overs_display="0.0",
+                            commentary=[],
+                            current_batsman="Opponent",
+                            current_bowler="CSK Bowler")
     else:
+        publish_to_spectators("end", {
+            "target": session["target"],
+            "second_innings": session["runs"]
+        })
         return render_template("result.html",
                                runs=session["runs"],
                                target=session["target"])
 
 
-@app.route("/get_effective_scores", methods=["POST"])
-def get_effective_scores():
-    data = request.json
-    action = data.get("action")
-    
-    # Get current players
+def current_matchup():
+    """(batsman, bowler) facing the next ball"""
     if session["innings"] == 1:
         batting_team = CSK_PLAYERS if session["decision"] == "bat" else MI_PLAYERS
         bowling_team = MI_PLAYERS if session["decision"] == "bat" else CSK_PLAYERS
@@ -506,11 +508,18 @@ def get_effective_scores():
         batting_team = MI_PLAYERS if session["decision"] == "bat" else CSK_PLAYERS
         bowling_team = CSK_PLAYERS if session["decision"] == "bat" else MI_PLAYERS
     
-    current_batsman = batting_team[session["wickets"]]
     over_no = session["balls"] // 6
     bowling_order = sorted([p for p in bowling_team if p["bowl"] > 0],
                            key=lambda x: x["bowl"], reverse=True)
-    current_bowler = bowling_order[over_no % len(bowling_order)]
+    return batting_team[session["wickets"]], bowling_order[over_no % len(bowling_order)]
+
+@app.route("/get_effective_scores", methods=["POST"])
+def get_effective_scores():
+    data = request.json
+    action = data.get("action")
+    
+    # Get current players
+    current_batsman, current_bowler = current_matchup()
     
     if action == "batting":
         # User is batting - show bot's bowling choice and all shot scores
@@ -522,7 +531,7 @@ def get_effective_scores():
         variation = session.get("stored_variation")
 
         if not bowling_type:
-            bowling_type, line, length, variation = ai_choose_ball()
+            bowling_type, line, length, variation = ai_choose_ball(current_batsman)
         
         # STORE the choice in session so it's reused when play_ball is called
             session["stored_bowling_type"] = bowling_type
@@ -531,25 +540,22 @@ def get_effective_scores():
             session["stored_variation"] = variation
             session.modified = True  # FORCE save the session
         
-        # Get all shot ratings for this bowling combination
-        all_shots = dropdown_data[bowling_type]["shots"]
-        shot_scores = []
-        
-        for shot in all_shots:
-            shot_rating = get_shot_rating(bowling_type, line, length, variation, shot)
-            effective = calculate_effective_score(
-                current_batsman["bat"],
-                current_bowler["bowl"],
-                shot_rating
-            )
-            shot_scores.append({
-                "name": shot,
-                "score": effective,
-                "type": "shot"
-            })
-        
-        # Sort by score
-        shot_scores.sort(key=lambda x: x["score"], reverse=True)
+        # Score every shot for this bowling combination, best first
+        scores = score_all_shots(
+            current_batsman["bat"],
+            current_bowler["bowl"],
+            bowling_type,
+            line,
+            length,
+            variation,
+            match_snapshot().ratings
+        )
+        effective = scores["effective"]
+        shot_scores = [{
+            "name": scores["shots"][i],
+            "score": int(effective[i]),
+            "type": "shot"
+        } for i in np.argsort(-effective, kind="stable")]
         
         return jsonify({
             "bot_choice": {
@@ -569,37 +575,40 @@ def get_effective_scores():
         length = data.get("length")
         variation = data.get("variation")
         
-        all_shots = dropdown_data[bowling_type]["shots"]
-        shot_scores = []
-        
-        for shot in all_shots:
-            shot_rating = get_shot_rating(bowling_type, line, length, variation, shot)
-            effective = calculate_effective_score(
-                current_batsman["bat"],
-                current_bowler["bowl"],
-                shot_rating
-            )
-            max_runs = SHOT_MAX_RUNS.get(shot, 4)
-            expected_runs = get_outcome_from_effective_score(effective, line, length, shot)
-            
-            shot_scores.append({
-                "name": shot,
-                "score": effective,
-                "expected_runs": expected_runs,
-                "type": "bowling"
-            })
-        
-        # Sort by score
-        shot_scores.sort(key=lambda x: x["score"], reverse=True)
+        scores = score_all_shots(
+            current_batsman["bat"],
+            current_bowler["bowl"],
+            bowling_type,
+            line,
+            length,
+            variation,
+            match_snapshot().ratings
+        )
+        effective = scores["effective"]
+        distribution = scores["distribution"]
+
+        # Exact expected runs and outcome probabilities, sorted by score
+        shot_scores = [{
+            "name": scores["shots"][i],
+            "score": int(effective[i]),
+            "expected_runs": round(float(scores["expected_runs"][i]), 2),
+            "distribution": {
+                str(outcome): round(float(p), 4)
+                for outcome, p in zip(OUTCOMES, distribution[i])
+            },
+            "type": "bowling"
+        } for i in np.argsort(-effective, kind="stable")]
         
         # Get bot's choice
+        # A preview stream, so this is not the shot the bot will play
         bot_shot, bot_effective = ai_choose_shot_by_mode(
             current_batsman,
             bowling_type,
             line,
             length,
             variation,
-            session["mode"]
+            session["mode"],
+            stream="preview"
         )
         
         return jsonify({
@@ -610,5 +619,145 @@ def get_effective_scores():
             },
             "all_scores": shot_scores
         })
+
+@app.route("/effective_scores/<bowling_type>")
+def effective_scores_batch(bowling_type):
+    """Bowling mode scores of every delivery of a type, for the rest of the over.
+
+    Columnar: score, runs and wicket are flat in (line, length, variation,
+    shot) order, 0 for deliveries the sheet does not have. bot_shots holds,
+    for each ball left in the over, the index of the bot's preview shot per
+    delivery (-1 where there is none) and bot_scores its effective score.
+    The client refetches after a wicket or at the next over.
+    """
+    snapshot = match_snapshot()
+    if bowling_type not in snapshot.dropdown_data:
+        return jsonify({"error": "Bowling type not found"}), 404
+
+    current_batsman, current_bowler = current_matchup()
+    sheet = score_sheet(current_batsman["bat"], current_bowler["bowl"],
+                        bowling_type, snapshot.ratings)
+    shot_index = {shot: i for i, shot in enumerate(sheet["shots"])}
+    deliveries = list(product(sheet["lines"], sheet["lengths"], sheet["variations"]))
+
+    # Same picks /get_effective_scores previews, ball by ball. Each pick
+    # draws from a fresh preview stream, restored rather than re-derived
+    mode = session["mode"]
+    weak_shot_balls = session.get("weak_shot_balls", [])
+    balls = range(session["balls"],
+                  min(session["balls"] // 6 * 6 + 6, session["overs"] * 6))
+    bot_shots = []
+    bot_scores = []
+    for ball in balls:
+        rng = match_rng("preview", session["innings"], ball + 1)
+        fresh = rng.getstate()
+        picks = []
+        picked_scores = []
+        for line, length, variation in deliveries:
+            rng.setstate(fresh)
+            try:
+                shot, effective = choose_shot(current_batsman, bowling_type, line, length,
+                                              variation, mode, ball, weak_shot_balls, rng,
+                                              snapshot.ratings)
+            except ValueError:
+                shot, effective = None, 0
+            picks.append(shot_index.get(shot, -1))
+            picked_scores.append(effective)
+        bot_shots.append(picks)
+        bot_scores.append(picked_scores)
+
+    return jsonify({
+        "bowling_type": bowling_type,
+        "batsman": current_batsman["name"],
+        "bowler": current_bowler["name"],
+        "balls": list(balls),
+        "lines": sheet["lines"],
+        "lengths": sheet["lengths"],
+        "variations": sheet["variations"],
+        "shots": sheet["shots"],
+        "score": sheet["effective"].ravel().tolist(),
+        "runs": sheet["runs"].ravel().tolist(),
+        "wicket": sheet["wicket"].round(4).ravel().tolist(),
+        "bot_shots": bot_shots,
+        "bot_scores": bot_scores
+    })
+
+@app.route("/replay")
+def get_replay():
+    """Replay log of the current match, one record per ball"""
+    if "replay" not in session:
+        return jsonify({"error": "No match in progress"}), 404
+
+    return Response(
+        bytes(session["replay"]),
+        mimetype="application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename=match-{session['seed']}.replay"}
+    )
+
+@app.route("/commentary")
+def get_commentary():
+    """Commentary of the current innings as JSON.
+
+    ?since=<ball> returns only the balls after that ball number, otherwise
+    ?page=<n>&per_page=<m> pages back from the newest ball.
+    """
+    log = session.get("commentary")
+    if log is None:
+        return jsonify({"error": "No match in progress"}), 404
+
+    since = request.args.get("since", type=int)
+    if since is not None:
+        entries = log.since(since)
+    else:
+        page = max(1, request.args.get("page", 1, type=int))
+        per_page = min(100, max(1, request.args.get("per_page", 20, type=int)))
+        entries = log.page(page, per_page)
+
+    return jsonify({
+        "innings": session["innings"],
+        "total_balls": len(log),
+        "entries": [{"ball": ball, "text": text} for ball, text in entries]
+    })
+
+@app.route("/scorecard")
+def get_scorecard():
+    """Player figures of both teams and runs conceded per bowling type"""
+    stats = session.get("stats")
+    if stats is None:
+        return jsonify({"error": "No match in progress"}), 404
+
+    combinations = match_snapshot().combinations
+    bowling_type = request.args.get("bowling_type")
+    if bowling_type is not None and bowling_type not in combinations.by_type:
+        return jsonify({"error": "Bowling type not found"}), 404
+
+    return jsonify({
+        "teams": [stats.scorecard("CSK"), stats.scorecard("MI")],
+        "deliveries": stats.delivery_summary(bowling_type, combinations)
+    })
+
+@app.route("/win_probability")
+def get_win_probability():
+    """Latest win probability estimate for the current match state"""
+    if "innings" not in session:
+        return jsonify({"error": "No match in progress"}), 404
+
+    batting_first = "CSK" if session["decision"] == "bat" else "MI"
+    bowling_first = "MI" if batting_first == "CSK" else "CSK"
+
+    state = match_state(
+        session["innings"],
+        session["runs"],
+        session["wickets"],
+        session["balls"],
+        session["target"],
+        session["overs"],
+        session["mode"],
+        batting_first,
+        bowling_first,
+        session.get("weak_shot_balls")
+    )
+    return jsonify(win_probability.latest(session.match_id, state))
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=10000)
\ No newline at end of file
@@ -0,0 +1,322 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from flask import session
+
+import app as web
+from combinations import COMBINATIONS
+from match_engine import pick_weak_shot_balls
+from shot import get_shot_rating, calculate_effective_score, simulate_ball
+from teams import CSK_PLAYERS, MI_PLAYERS
+
+RESULTS_DIR = "benchmark_results"
+
+TOSS_FORM = {
+    "toss_call": "Heads",
+    "time": "Night Match",
+    "pitch": "Dry Pitch",
+    "dew": "High Dew",
+    "rain": "No Rain",
+    "humidity": "High Humidity",
+    "turn": "Fast Pitch",
+    "ground": "Small Ground"
+}
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(fn, iterations, warmup=50, prepare=None, alloc_iterations=200):
+    """Time `fn` call by call, then count its allocations in a second pass.
+
+    `prepare` runs untimed before every call, e.g. to start a new match
+    when the last one finished. Allocations are traced separately because
+    tracemalloc slows every call down.
+    """
+    def call():
+        if prepare:
+            prepare()
+        fn()
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    elapsed = 0
+    for _ in range(iterations):
+        if prepare:
+            prepare()
+        start = time.perf_counter_ns()
+        fn()
+        took = time.perf_counter_ns() - start
+        timings.append(took)
+        elapsed += took
+    timings.sort()
+
+    alloc_iterations = min(alloc_iterations, iterations)
+    peaks = 0
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(alloc_iterations):
+            if prepare:
+                prepare()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - base
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    def us(ns):
+        return round(ns / 1000, 3)
+
+    return {
+        "iterations": iterations,
+        "mean_us": us(elapsed / iterations),
+        "p50_us": us(percentile(timings, 50)),
+        "p90_us": us(percentile(timings, 90)),
+        "p99_us": us(percentile(timings, 99)),
+        "max_us": us(timings[-1]),
+        "calls_per_sec": round(iterations / (elapsed / 1e9), 1),
+        "peak_alloc_bytes_per_call": round(peaks / alloc_iterations),
+        "retained_bytes": after - before
+    }
+
+
+# ----------------------------
+# Cases
+# ----------------------------
+def random_calls(rng, count):
+    """Pre-drawn (delivery, shot, batsman, bowler) tuples so drawing is not timed"""
+    calls = []
+    for _ in range(count):
+        delivery = COMBINATIONS.sample(rng)
+        shot = rng.choice(web.rating_snapshots.current.dropdown_data[delivery[0]]["shots"])
+        calls.append((delivery, shot, rng.choice(CSK_PLAYERS), rng.choice(MI_PLAYERS)))
+    return calls
+
+
+def cycle(values):
+    """fn() that returns the next value of a list, round and round"""
+    state = {"i": -1}
+
+    def next_value():
+        state["i"] = (state["i"] + 1) % len(values)
+        return values[state["i"]]
+    return next_value
+
+
+def engine_cases(rng):
+    calls = cycle(random_calls(rng, 4096))
+
+    def rating():
+        delivery, shot, _, _ = calls()
+        get_shot_rating(*delivery, shot)
+
+    def effective():
+        _, _, batsman, bowler = calls()
+        calculate_effective_score(batsman["bat"], bowler["bowl"] or 75, 80)
+
+    def ball():
+        delivery, shot, batsman, bowler = calls()
+        simulate_ball(batsman["bat"], bowler["bowl"] or 75, *delivery, shot)
+
+    return {
+        "get_shot_rating": (rating, None),
+        "calculate_effective_score": (effective, None),
+        "simulate_ball": (ball, None)
+    }
+
+
+def bot_cases(rng, mode):
+    """AI choices inside a request context holding a live match session"""
+    calls = cycle(random_calls(rng, 4096))
+    context = web.app.test_request_context()
+    context.push()
+    session["seed"] = rng.randrange(2 ** 63)
+    session["mode"] = mode
+    session["overs"] = 20
+    session["innings"] = 1
+    session["balls"] = 0
+    session["weak_shot_balls"] = pick_weak_shot_balls(20, mode, rng)
+
+    def choose_ball():
+        _, _, batsman, _ = calls()
+        web.ai_choose_ball(batsman)
+
+    def choose_shot():
+        delivery, _, batsman, _ = calls()
+        session["balls"] = (session["balls"] + 1) % 120
+        web.ai_choose_shot_by_mode(batsman, *delivery, mode)
+
+    return {
+        f"ai_choose_ball[{mode}]": (choose_ball, None),
+        f"ai_choose_shot_by_mode[{mode}]": (choose_shot, None)
+    }, context
+
+
+def route_cases(rng, mode, decision):
+    """Routes through the test client, a new match starts whenever one ends"""
+    client = web.app.test_client()
+    state = {"finished": True}
+
+    def new_match():
+        client.post("/toss", query_string={"seed": rng.randrange(2 ** 63)},
+                    data={"team": "CSK", "overs": "20", "mode": mode})
+        client.post("/calculate_toss", data=TOSS_FORM)
+        client.post("/start", data={"decision": decision})
+        state["finished"] = False
+
+    def ensure_match():
+        if state["finished"]:
+            new_match()
+
+    def play_ball():
+        delivery = COMBINATIONS.sample(rng, "Fast")
+        response = client.post("/play_ball", data={
+            "shot": rng.choice(web.rating_snapshots.current.dropdown_data["Fast"]["shots"]),
+            "bowling_type": delivery[0],
+            "line": delivery[1],
+            "length": delivery[2],
+            "variation": delivery[3],
+            "show_score": "yes"
+        })
+        state["finished"] = b"Final Score" in response.data
+
+    def effective_scores():
+        delivery = COMBINATIONS.sample(rng, "Fast")
+        client.post("/get_effective_scores", json={
+            "action": "bowling",
+            "bowling_type": delivery[0],
+            "line": delivery[1],
+            "length": delivery[2],
+            "variation": delivery[3]
+        })
+        client.post("/get_effective_scores", json={"action": "batting"})
+
+    return {
+        f"route:/play_ball[{decision}]": (play_ball, ensure_match),
+        f"route:/get_effective_scores[{decision}]": (effective_scores, ensure_match)
+    }
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def run_benchmarks(iterations=2000, route_iterations=300, seed=0, only=None):
+    rng = random.Random(seed)
+
+    cases = engine_cases(rng)
+    contexts = []
+    for mode in ("medium", "hard"):
+        bot, context = bot_cases(rng, mode)
+        cases.update(bot)
+        contexts.append(context)
+
+    results = {}
+    try:
+        for name, (fn, prepare) in cases.items():
+            if only and not any(o in name for o in only):
+                continue
+            results[name] = measure(fn, iterations, prepare=prepare)
+            print(f"{name:42} p50 {results[name]['p50_us']:>10} us", file=sys.stderr)
+    finally:
+        for context in reversed(contexts):
+            context.pop()
+
+    for decision in ("bat", "bowl"):
+        for name, (fn, prepare) in route_cases(rng, "medium", decision).items():
+            if only and not any(o in name for o in only):
+                continue
+            results[name] = measure(fn, route_iterations, warmup=10,
+                                    prepare=prepare, alloc_iterations=50)
+            print(f"{name:42} p50 {results[name]['p50_us']:>10} us", file=sys.stderr)
+
+    commit, dirty = git_revision()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results
+    }
+
+
+def compare(base, current):
+    """Print p50 and p99 changes against an earlier results file"""
+    print(f"{'benchmark':42} {'p50 base':>10} {'p50 now':>10} {'change':>8} {'p99 change':>11}")
+    for name, now in current["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            print(f"{name:42} {'-':>10} {now['p50_us']:>10} {'new':>8}")
+            continue
+
+        def change(key):
+            return f"{100 * (now[key] - before[key]) / max(before[key], 1e-9):+.1f}%"
+        print(f"{name:42} {before['p50_us']:>10} {now['p50_us']:>10} "
+              f"{change('p50_us'):>8} {change('p99_us'):>11}")
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the per-ball path")
+    parser.add_argument("-n", "--iterations", type=int, default=2000)
+    parser.add_argument("--route-iterations", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this")
+    parser.add_argument("-o", "--output", help=f"defaults to {RESULTS_DIR}/<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.route_iterations, args.seed, args.only)
+
+    output = args.output
+    if output is None:
+        name = results["commit"] or "results"
+        if results["dirty"]:
+            name += "-dirty"
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}.json")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
@@ -0,0 +1,241 @@
+"""Offline solver for the bot bowler's delivery tables.
+
+Only hard mode bowls from the solved table (see BOT_STRATEGY), easy and
+medium bots keep bowling uniformly at random. Run as a build step, it
+re-solves only when bowling_strategy.json is missing or was solved for
+an older workbook.
+"""
+import argparse
+import json
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+
+from match_engine import BOT_BOWLER_RATING, WEAK_SHOT_PERCENTAGE
+from ratings import source_stamp
+from shot import (
+    FILE_PATH,
+    RATINGS,
+    OUTCOME_TABLE,
+    OUTCOME_EXPECTED_RUNS,
+    SHOT_MAX_RUNS,
+    max_runs_class,
+    is_wicket_delivery
+)
+
+STRATEGY_PATH = "bowling_strategy.json"
+
+# Deliveries kept per batsman rating, the bot mixes uniformly over them
+# so it stays hard to read
+TOP_K = 8
+
+OBJECTIVES = ("runs", "wickets")
+
+# Which table the live bot bowler uses per mode, modes left out keep
+# bowling uniformly at random
+BOT_STRATEGY = {
+    "hard": "runs"
+}
+
+
+# ----------------------------
+# Solver
+# ----------------------------
+def weak_shot_fraction(overs, mode):
+    """Share of balls pick_weak_shot_balls marks as weak for an innings"""
+    total_balls = overs * 6
+    weak_percentage = WEAK_SHOT_PERCENTAGE.get(mode, WEAK_SHOT_PERCENTAGE["hard"])
+    return max(1, int(total_balls * weak_percentage)) / total_balls
+
+
+def sheet_outcomes(bowling_type, batsman_rating):
+    """Expected runs and wicket chance of every delivery of one sheet.
+
+    Models the batsman as choose_shot does: shots are ranked by effective
+    score against BOT_BOWLER_RATING, a weak ball is a uniform pick from the
+    lower third and any other ball a uniform pick from the upper third.
+    Returns ((weak runs, strong runs), (weak wickets, strong wickets)),
+    each flattened in CombinationIndex order.
+    """
+    vocab = RATINGS.sheets[bowling_type]
+    ratings = RATINGS.cube[RATINGS.type_index[bowling_type]][np.ix_(
+        [RATINGS.line_index[v] for v in vocab["lines"]],
+        [RATINGS.length_index[v] for v in vocab["lengths"]],
+        [RATINGS.variation_index[v] for v in vocab["variations"]],
+        RATINGS.sheet_shot_columns[bowling_type]
+    )]
+
+    score = (
+        0.8 * ratings +
+        0.4 * batsman_rating -
+        0.2 * BOT_BOWLER_RATING
+    )
+    effective = np.clip(score.astype(int), 1, 100)
+
+    classes = np.array([max_runs_class(SHOT_MAX_RUNS.get(shot, 4))
+                        for shot in vocab["shots"]])
+    at_stumps = np.array([[int(is_wicket_delivery(line, length))
+                           for length in vocab["lengths"]]
+                          for line in vocab["lines"]])
+    index = (effective,
+             classes[None, None, None, :],
+             at_stumps[:, :, None, None])
+
+    n = len(vocab["shots"])
+    weak = slice(0, n // 3 + 1)
+    strong = slice(min(n * 2 // 3, n - 1), n)
+    order = np.argsort(effective, axis=-1, kind="stable")
+    # Missing cells can never be bowled
+    missing = ~ratings.all(axis=-1).reshape(-1)
+
+    def by_third(values, missing_value):
+        ranked = np.take_along_axis(values, order, axis=-1)
+        thirds = []
+        for third in (weak, strong):
+            mean = ranked[..., third].mean(axis=-1).reshape(-1)
+            mean[missing] = missing_value
+            thirds.append(mean)
+        return thirds
+
+    return (by_third(OUTCOME_EXPECTED_RUNS[index], np.inf),
+            by_third(OUTCOME_TABLE[index][..., -1], -np.inf))
+
+
+def solve_rating(batsman_rating, overs=20, top_k=TOP_K):
+    """Best deliveries against one batsman rating, for every mode and objective"""
+    combinations = []
+    runs = ([], [])
+    wickets = ([], [])
+
+    for bowling_type in RATINGS.bowling_types:
+        vocab = RATINGS.sheets[bowling_type]
+        for line in vocab["lines"]:
+            for length in vocab["lengths"]:
+                for variation in vocab["variations"]:
+                    combinations.append((bowling_type, line, length, variation))
+
+        sheet_runs, sheet_wickets = sheet_outcomes(bowling_type, batsman_rating)
+        for totals, thirds in ((runs, sheet_runs), (wickets, sheet_wickets)):
+            for total, third in zip(totals, thirds):
+                total.append(third)
+
+    weak_runs, strong_runs = (np.concatenate(v) for v in runs)
+    weak_wickets, strong_wickets = (np.concatenate(v) for v in wickets)
+
+    solved = {}
+    for mode in WEAK_SHOT_PERCENTAGE:
+        p = weak_shot_fraction(overs, mode)
+        expected_runs = p * weak_runs + (1 - p) * strong_runs
+        wicket_probability = p * weak_wickets + (1 - p) * strong_wickets
+
+        # Ties on one objective are broken by the other
+        for objective, keys in (("runs", (-wicket_probability, expected_runs)),
+                                ("wickets", (expected_runs, -wicket_probability))):
+            best = np.lexsort(keys)[:top_k]
+            solved[(objective, mode)] = [
+                list(combinations[i]) + [round(float(expected_runs[i]), 4),
+                                         round(float(wicket_probability[i]), 4)]
+                for i in best
+            ]
+
+    return batsman_rating, solved
+
+
+def _solve_rating(args):
+    return solve_rating(*args)
+
+
+def solve_strategies(overs=20, top_k=TOP_K, workers=None):
+    """Solve every batsman rating 1-100 over a process pool"""
+    jobs = [(rating, overs, top_k) for rating in range(1, 101)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(_solve_rating, jobs)
+    else:
+        results = [_solve_rating(job) for job in jobs]
+
+    strategies = {objective: {mode: {} for mode in WEAK_SHOT_PERCENTAGE}
+                  for objective in OBJECTIVES}
+    for rating, solved in results:
+        for (objective, mode), deliveries in solved.items():
+            strategies[objective][mode][str(rating)] = deliveries
+
+    return {
+        "source": source_stamp(FILE_PATH) if os.path.exists(FILE_PATH) else None,
+        "overs": overs,
+        "top_k": top_k,
+        # Each delivery is [bowling_type, line, length, variation,
+        # expected runs, wicket probability]
+        "strategies": strategies
+    }
+
+
+# ----------------------------
+# Lookup Table
+# ----------------------------
+class BowlingStrategy:
+    """Precomputed strategy table, one lookup and one random pick per ball"""
+
+    def __init__(self, data):
+        self.data = data
+        self.strategies = data["strategies"]
+
+    def deliveries(self, objective, mode, batsman_rating):
+        rating = min(100, max(1, int(batsman_rating)))
+        return self.strategies[objective][mode][str(rating)]
+
+    def choose(self, mode, batsman_rating, rng=random):
+        """Delivery for the live bot bowler, None when the mode bowls at random"""
+        objective = BOT_STRATEGY.get(mode)
+        if objective is None:
+            return None
+
+        delivery = rng.choice(self.deliveries(objective, mode, batsman_rating))
+        return tuple(delivery[:4])
+
+
+def load_strategy(path=STRATEGY_PATH):
+    """Load the strategy table, None if it is missing or older than the workbook"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if os.path.exists(FILE_PATH) and data.get("source") != source_stamp(FILE_PATH):
+        return None
+
+    return BowlingStrategy(data)
+
+
+# ----------------------------
+# BUILD STEP
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Solve bot bowling strategies from the rating cube")
+    parser.add_argument("--overs", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("-o", "--output", default=STRATEGY_PATH)
+    parser.add_argument("--force", action="store_true",
+                        help="re-solve even if the table matches the workbook")
+    args = parser.parse_args()
+
+    # Same freshness rule as the app's load_strategy, plus the solver options
+    current = load_strategy(args.output)
+    if (not args.force and current is not None
+            and current.data.get("overs") == args.overs
+            and current.data.get("top_k") == args.top_k):
+        print(f"{args.output} is up to date with {FILE_PATH}")
+        raise SystemExit(0)
+
+    data = solve_strategies(args.overs, args.top_k, args.workers)
+    with open(args.output, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+    print(f"Solved {len(OBJECTIVES) * len(WEAK_SHOT_PERCENTAGE) * 100} strategies -> {args.output}")
@@ -0,0 +1,124 @@
+import random
+
+from shot import RATINGS, get_dropdown_data
+
+# How strongly each difficulty mode favours deliveries that are hard to
+# score off: weight = (101 - mean shot rating) ** exponent
+MODE_WEIGHT_EXPONENT = {
+    "easy": 0,
+    "medium": 1,
+    "hard": 2
+}
+
+
+# ----------------------------
+# Alias Table (Vose)
+# ----------------------------
+def build_alias_table(weights):
+    """Alias table for O(1) sampling from a discrete distribution"""
+    n = len(weights)
+    total = float(sum(weights))
+    if n == 0 or total <= 0:
+        raise ValueError("Weights must contain a positive value")
+
+    scaled = [w * n / total for w in weights]
+    prob = [0.0] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = scaled[l] + scaled[s] - 1.0
+        (small if scaled[l] < 1.0 else large).append(l)
+
+    # Leftovers are 1.0 up to float error
+    for i in small + large:
+        prob[i] = 1.0
+
+    return prob, alias
+
+
+# ----------------------------
+# Combination Index
+# ----------------------------
+class CombinationIndex:
+    """Every valid (bowling_type, line, length, variation), built once.
+
+    Keeps one flat tuple for uniform sampling across all sheets plus a
+    slice per bowling type, and caches alias tables for weighted sampling.
+    `ratings` is the store the dropdown data came from.
+    """
+
+    def __init__(self, dropdown_data, ratings=RATINGS):
+        self.ratings = ratings
+        combinations = []
+        self.type_ranges = {}
+
+        for bowling_type, sheet in dropdown_data.items():
+            start = len(combinations)
+            for line in sheet["lines"]:
+                for length in sheet["lengths"]:
+                    for variation in sheet["variations"]:
+                        combinations.append((bowling_type, line, length, variation))
+            self.type_ranges[bowling_type] = (start, len(combinations))
+
+        self.combinations = tuple(combinations)
+        self.index = {c: i for i, c in enumerate(self.combinations)}
+        self.by_type = {
+            bowling_type: self.combinations[start:end]
+            for bowling_type, (start, end) in self.type_ranges.items()
+        }
+        self._alias_tables = {}
+
+    def __len__(self):
+        return len(self.combinations)
+
+    def sample(self, rng=random, bowling_type=None):
+        """Uniform pick, over one bowling type or over every sheet"""
+        if bowling_type is None:
+            return rng.choice(self.combinations)
+        return rng.choice(self.by_type[bowling_type])
+
+    def sample_weighted(self, key, rng=random):
+        """O(1) pick from a distribution registered with add_weights"""
+        prob, alias = self._alias_tables[key]
+        i = rng.randrange(len(prob))
+        if rng.random() >= prob[i]:
+            i = alias[i]
+        return self.combinations[i]
+
+    def add_weights(self, key, weights):
+        """Register per-combination weights (aligned with .combinations)"""
+        if len(weights) != len(self.combinations):
+            raise ValueError("Need one weight per combination")
+        self._alias_tables[key] = build_alias_table(weights)
+
+    def sample_by_type(self, type_weights, rng=random):
+        """Pick with each bowling type getting its share of `type_weights`"""
+        key = ("type", tuple(sorted(type_weights.items())))
+        if key not in self._alias_tables:
+            weights = [0.0] * len(self.combinations)
+            for bowling_type, (start, end) in self.type_ranges.items():
+                share = type_weights.get(bowling_type, 0) / max(1, end - start)
+                weights[start:end] = [share] * (end - start)
+            self.add_weights(key, weights)
+        return self.sample_weighted(key, rng)
+
+    def sample_for_mode(self, mode, rng=random):
+        """Pick favouring hard-to-score deliveries more as modes get harder"""
+        key = ("mode", mode)
+        if key not in self._alias_tables:
+            exponent = MODE_WEIGHT_EXPONENT.get(mode, MODE_WEIGHT_EXPONENT["hard"])
+            weights = []
+            for bowling_type, line, length, variation in self.combinations:
+                _, ratings = self.ratings.shot_vector(bowling_type, line, length, variation)
+                weights.append((101 - float(ratings.mean())) ** exponent)
+            self.add_weights(key, weights)
+        return self.sample_weighted(key, rng)
+
+
+COMBINATIONS = CombinationIndex(get_dropdown_data())
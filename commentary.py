@@ -0,0 +1,67 @@
+from collections import deque
+from itertools import islice
+
+# Balls shown on the match page, two overs
+COMMENTARY_CAPACITY = 12
+
+# Balls kept for /commentary, a full 20 over innings
+COMMENTARY_HISTORY = 120
+
+
+# ----------------------------
+# Commentary Log
+# ----------------------------
+class CommentaryLog:
+    """Commentary for one innings.
+
+    The last `capacity` balls sit in a ring buffer for rendering, the
+    last `history` balls in a longer one only ever read by page/since.
+    Balls keep their numbers after older ones are dropped.
+    """
+
+    def __init__(self, capacity=COMMENTARY_CAPACITY, history=COMMENTARY_HISTORY):
+        self.recent = deque(maxlen=capacity)
+        self.entries = deque(maxlen=history)
+        self.balls = 0
+
+    def __len__(self):
+        return self.balls
+
+    def add(self, text):
+        self.balls += 1
+        entry = (self.balls, text)
+        self.entries.append(entry)
+        self.recent.append(entry)
+        return entry[0]
+
+    def latest(self):
+        """Recent lines, newest first"""
+        return [text for _, text in reversed(self.recent)]
+
+    def since(self, ball):
+        """Kept entries after ball number `ball`, oldest first"""
+        dropped = self.balls - len(self.entries)
+        return list(islice(self.entries, max(0, ball - dropped), None))
+
+    def page(self, page=1, per_page=COMMENTARY_CAPACITY):
+        """Page of kept entries counting back from the newest ball"""
+        end = len(self.entries) - (page - 1) * per_page
+        start = max(0, end - per_page)
+        return list(reversed(list(islice(self.entries, start, max(0, end)))))
+
+
+# ----------------------------
+# Ball Commentary
+# ----------------------------
+def generate_commentary(batsman, bowler, result):
+    if result == "W":
+        return f"OUT! {batsman} dismissed by {bowler}!"
+    if result == 6:
+        return f"SIX by {batsman}!"
+    if result == 4:
+        return f"FOUR by {batsman}!"
+    if result == 2:
+        return f"{batsman} scores 2 runs."
+    if result == 1:
+        return f"Single taken by {batsman}."
+    return f"{batsman} plays a dot ball."
@@ -0,0 +1,277 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+# Every condition the toss screen offers
+TOSS_CONDITIONS = {
+    "time": ["Afternoon Match", "Night Match"],
+    "pitch": ["Dry Pitch", "Green Pitch"],
+    "dew": ["High Dew", "No Dew"],
+    "rain": ["Rain Affected", "No Rain"],
+    "humidity": ["High Humidity", "Normal Humidity"],
+    "turn": ["Slow Turning Pitch", "Fast Pitch"],
+    "ground": ["Small Ground", "Large Ground"]
+}
+
+# Latency histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+OVERS_PATTERN = re.compile(rb'id="oversDisplay">\s*([0-9.]+)')
+
+
+# ----------------------------
+# Latency Recording
+# ----------------------------
+class EndpointStats:
+    """Latency samples and a bucketed histogram for one endpoint"""
+
+    def __init__(self):
+        self.samples = []
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.errors = 0
+
+    def add(self, seconds, ok):
+        ms = seconds * 1000
+        self.samples.append(ms)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed):
+        samples = sorted(self.samples)
+
+        def pct(q):
+            if not samples:
+                return 0
+            return round(samples[min(len(samples) - 1, int(q / 100 * len(samples)))], 3)
+
+        return {
+            "requests": len(samples),
+            "errors": self.errors,
+            "requests_per_sec": round(len(samples) / elapsed, 2) if elapsed else 0,
+            "mean_ms": round(sum(samples) / len(samples), 3) if samples else 0,
+            "p50_ms": pct(50),
+            "p90_ms": pct(90),
+            "p99_ms": pct(99),
+            "max_ms": round(samples[-1], 3) if samples else 0,
+            "histogram_ms": {
+                **{f"<={bound}": count for bound, count in zip(BUCKETS_MS, self.buckets)},
+                f">{BUCKETS_MS[-1]}": self.buckets[-1]
+            }
+        }
+
+
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.matches = 0
+        self.balls = 0
+        self.failed_matches = 0
+
+    def add(self, endpoint, seconds, ok):
+        with self.lock:
+            self.endpoints.setdefault(endpoint, EndpointStats()).add(seconds, ok)
+
+
+# ----------------------------
+# Simulated Player
+# ----------------------------
+class MatchClient:
+    """One browser: its own cookie jar, playing one match at a time"""
+
+    def __init__(self, base_url, recorder, rng, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, endpoint, path, form=None, payload=None):
+        headers = {}
+        data = None
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                body = response.read()
+            ok = True
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            ok = False
+        finally:
+            self.recorder.add(endpoint, time.perf_counter() - start, ok)
+
+        if not ok:
+            raise RuntimeError(f"{path} failed")
+        return body
+
+    def play_match(self, overs, mode, decision, dropdown):
+        rng = self.rng
+        decision = decision or rng.choice(["bat", "bowl"])
+
+        self.request("/toss", "/toss", form={"team": "CSK", "overs": overs, "mode": mode})
+        conditions = {key: rng.choice(values) for key, values in TOSS_CONDITIONS.items()}
+        conditions["toss_call"] = rng.choice(["Heads", "Tails"])
+        self.request("/calculate_toss", "/calculate_toss", form=conditions)
+        self.request("/start", "/start", form={"decision": decision})
+
+        innings = 1
+        balls = 0
+        # Both innings plus the call that switches innings, with headroom
+        for _ in range(overs * 12 + 10):
+            user_is_batting = (innings == 1) == (decision == "bat")
+            bowling_type = rng.choice(list(dropdown))
+            sheet = dropdown[bowling_type]
+            delivery = {
+                "bowling_type": bowling_type,
+                "line": rng.choice(sheet["lines"]),
+                "length": rng.choice(sheet["lengths"]),
+                "variation": rng.choice(sheet["variations"])
+            }
+
+            if user_is_batting:
+                self.request("/get_effective_scores", "/get_effective_scores",
+                             payload={"action": "batting"})
+                form = {"shot": rng.choice(sheet["shots"]), "show_score": "yes"}
+            else:
+                self.request("/get_effective_scores", "/get_effective_scores",
+                             payload={"action": "bowling", **delivery})
+                form = dict(delivery, show_score="yes")
+
+            body = self.request("/play_ball", "/play_ball", form=form)
+            if b"Final Score" in body:
+                return balls
+
+            overs_shown = OVERS_PATTERN.search(body)
+            if overs_shown and overs_shown.group(1) == b"0.0":
+                # The call after the last ball switches innings
+                innings = 2
+            else:
+                balls += 1
+                with self.recorder.lock:
+                    self.recorder.balls += 1
+
+        raise RuntimeError("Match did not finish")
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def run_load(base_url, concurrency=8, matches=32, overs=2, mode="medium",
+             decision=None, seed=None, timeout=30):
+    """Play `matches` full matches over `concurrency` client threads"""
+    recorder = Recorder()
+    base_rng = random.Random(seed)
+    seeds = [base_rng.randrange(2 ** 32) for _ in range(concurrency)]
+    remaining = [matches]
+    lock = threading.Lock()
+
+    with urllib.request.urlopen(base_url.rstrip("/") + "/dropdown_data.json",
+                                timeout=timeout) as response:
+        dropdown = json.loads(response.read())
+
+    def worker(worker_seed):
+        client = MatchClient(base_url, recorder, random.Random(worker_seed), timeout)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            try:
+                client.play_match(overs, mode, decision, dropdown)
+                with recorder.lock:
+                    recorder.matches += 1
+            except (OSError, RuntimeError) as e:
+                with recorder.lock:
+                    recorder.failed_matches += 1
+                print(f"match failed: {e}", file=sys.stderr)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(s,), daemon=True) for s in seeds]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "overs": overs,
+        "mode": mode,
+        "elapsed_sec": round(elapsed, 3),
+        "matches": recorder.matches,
+        "failed_matches": recorder.failed_matches,
+        "balls": recorder.balls,
+        "matches_per_sec": round(recorder.matches / elapsed, 3),
+        "balls_per_sec": round(recorder.balls / elapsed, 2),
+        "endpoints": {name: stats.summary(elapsed)
+                      for name, stats in recorder.endpoints.items()}
+    }
+
+
+def print_report(report, out=sys.stdout):
+    print(f"{report['matches']} matches ({report['failed_matches']} failed), "
+          f"{report['balls']} balls in {report['elapsed_sec']}s "
+          f"with {report['concurrency']} clients: "
+          f"{report['matches_per_sec']} matches/s, {report['balls_per_sec']} balls/s", file=out)
+
+    for name, stats in report["endpoints"].items():
+        print(f"\n{name}: {stats['requests']} requests, {stats['errors']} errors, "
+              f"{stats['requests_per_sec']} req/s, p50 {stats['p50_ms']}ms, "
+              f"p90 {stats['p90_ms']}ms, p99 {stats['p99_ms']}ms, max {stats['max_ms']}ms", file=out)
+        top = max(stats["histogram_ms"].values()) or 1
+        for bucket, count in stats["histogram_ms"].items():
+            print(f"  {bucket:>8} ms {'#' * round(40 * count / top):40} {count}", file=out)
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Play full matches concurrently against a running server",
+        epilog="With more than one gunicorn worker the server needs a shared "
+               "MATCH_STORE=sqlite:<path> (the default), not memory."
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--matches", type=int, default=32)
+    parser.add_argument("--overs", type=int, default=2)
+    parser.add_argument("--mode", choices=["easy", "medium", "hard"], default="medium")
+    parser.add_argument("--decision", choices=["bat", "bowl"], help="random per match by default")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("-o", "--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run_load(args.url, args.concurrency, args.matches, args.overs,
+                      args.mode, args.decision, args.seed, args.timeout)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
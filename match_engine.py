@@ -0,0 +1,519 @@
+import argparse
+import json
+import random
+import sys
+from functools import lru_cache
+from multiprocessing import Pool
+
+import numpy as np
+
+from combinations import COMBINATIONS
+from shot import (
+    RATINGS,
+    OUTCOME_RUNS,
+    OUTCOME_WICKET_RISK,
+    SHOT_MAX_RUNS,
+    get_outcome_from_effective_score,
+    score_all_shots,
+    max_runs_class,
+    is_wicket_delivery
+)
+from stats import MatchStats
+from teams import TEAMS, get_bowling_order
+
+# The batting bot always rates its shots against this bowler rating
+BOT_BOWLER_RATING = 75
+
+# Share of balls on which the batting bot deliberately plays a weak shot
+WEAK_SHOT_PERCENTAGE = {
+    "easy": 0.15,
+    "medium": 0.08,
+    "hard": 0.03
+}
+
+
+# ----------------------------
+# BOT RULES
+# ----------------------------
+def pick_weak_shot_balls(overs, mode, rng=random):
+    """Ball numbers of an innings on which the bot picks a weak shot"""
+    total_balls = overs * 6
+    weak_percentage = WEAK_SHOT_PERCENTAGE.get(mode, WEAK_SHOT_PERCENTAGE["hard"])
+
+    num_weak_balls = max(1, int(total_balls * weak_percentage))
+
+    return rng.sample(range(total_balls), num_weak_balls)
+
+
+@lru_cache(maxsize=16384)
+def get_shot_ranking(bowling_type, line, length, variation, batsman_rating,
+                     ratings=None):
+    """Bot's view of a delivery, computed once per key.
+
+    Returns (shots, effective scores) sorted lowest to highest, plus the
+    last index of the weak third and the first index of the strong third.
+    The rating store is part of the key, so each snapshot ranks its own.
+    """
+    scores = score_all_shots(
+        batsman_rating,
+        BOT_BOWLER_RATING,
+        bowling_type,
+        line,
+        length,
+        variation,
+        ratings
+    )
+    order = np.argsort(scores["effective"], kind="stable")
+    shots = tuple(scores["shots"][i] for i in order)
+    effective = tuple(int(scores["effective"][i]) for i in order)
+    n = len(shots)
+
+    return shots, effective, n // 3, n * 2 // 3
+
+
+def choose_shot(batsman, bowling_type, line, length, variation, mode,
+                ball, weak_shot_balls, rng=random, ratings=None):
+    """Bot shot choice, returns (shot, effective score)"""
+    shots, effective, weak_end, strong_start = get_shot_ranking(
+        bowling_type, line, length, variation, batsman["bat"], ratings)
+    n = len(shots)
+
+    if ball in weak_shot_balls:
+        # Pick a weak shot (from lower 1/3)
+        idx = rng.randint(0, weak_end) if weak_end > 0 else 0
+    else:
+        # Every mode picks a strong shot from the upper 1/3, modes only
+        # differ in how many weak shot balls they get
+        idx = rng.randint(strong_start, n - 1) if strong_start < n else n - 1
+
+    return shots[idx], effective[idx]
+
+
+# ----------------------------
+# MATCH ENGINE
+# ----------------------------
+class MatchEngine:
+    """Plays whole bot vs bot matches without Flask.
+
+    Follows the /play_ball rules: batting order is the squad order, the
+    batting bot picks shots by mode against a fixed bowler rating of 75
+    with weak shot balls drawn per innings, and the second innings is
+    always played out, the chase succeeding when runs reach the target.
+
+    `outcome_rng` rolls for wickets, by default the engine's rng.
+    `on_ball`, if given, is called with a dict describing every ball as it
+    is played. It never draws from the engine's rng, so seeded results are
+    the same with or without it.
+    """
+
+    def __init__(self, overs=20, mode="medium", batting_first="CSK",
+                 bowling_first="MI", rng=None, on_ball=None, outcome_rng=None):
+        self.overs = overs
+        self.mode = mode
+        self.batting_first = batting_first
+        self.bowling_first = bowling_first
+        self.rng = rng or random.Random()
+        self.outcome_rng = outcome_rng or self.rng
+        self.on_ball = on_ball
+
+    def play_innings(self, batting_team, bowling_team, runs=0, wickets=0,
+                     balls=0, weak_shot_balls=None, innings=1):
+        """Play an innings to the end, optionally from a mid-innings state"""
+        rng = self.rng
+        total_balls = self.overs * 6
+        if weak_shot_balls is None:
+            weak_shot_balls = pick_weak_shot_balls(self.overs, self.mode, rng)
+        weak_shot_balls = set(weak_shot_balls)
+
+        on_ball = self.on_ball
+        bowling_order = get_bowling_order(bowling_team) if on_ball else None
+        innings_no = innings
+        innings = {"runs": runs, "wickets": wickets, "balls": balls,
+                   "dots": 0, "twos": 0, "fours": 0, "sixes": 0}
+
+        while innings["balls"] < total_balls and innings["wickets"] < 10:
+            batsman = batting_team[innings["wickets"]]
+            bowling_type, line, length, variation = COMBINATIONS.sample(rng)
+
+            shot, effective = choose_shot(
+                batsman,
+                bowling_type,
+                line,
+                length,
+                variation,
+                self.mode,
+                innings["balls"],
+                weak_shot_balls,
+                rng
+            )
+            result = get_outcome_from_effective_score(effective, line, length, shot,
+                                                      self.outcome_rng)
+
+            innings["balls"] += 1
+            if result == "W":
+                innings["wickets"] += 1
+            else:
+                innings["runs"] += result
+                innings[{0: "dots", 2: "twos", 4: "fours", 6: "sixes"}[result]] += 1
+
+            if on_ball:
+                on_ball({
+                    "innings": innings_no,
+                    "ball": innings["balls"],
+                    "batsman": batsman,
+                    "bowler": bowling_order[(innings["balls"] - 1) // 6 % len(bowling_order)],
+                    "bowling_type": bowling_type,
+                    "line": line,
+                    "length": length,
+                    "variation": variation,
+                    "shot": shot,
+                    "effective": effective,
+                    "result": result,
+                    "runs": innings["runs"],
+                    "wickets": innings["wickets"]
+                })
+
+        return innings
+
+    def play_match(self):
+        return self.play_from(1, 0, 0, 0)
+
+    def play_from(self, innings, runs, wickets, balls, target=None,
+                  weak_shot_balls=None):
+        """Finish a match from the state /play_ball keeps in the session"""
+        batting_first = TEAMS[self.batting_first]
+        bowling_first = TEAMS[self.bowling_first]
+
+        if innings == 1:
+            first = self.play_innings(batting_first, bowling_first, runs,
+                                      wickets, balls, weak_shot_balls)
+            target = first["runs"] + 1
+            second = self.play_innings(bowling_first, batting_first, innings=2)
+        else:
+            first = None
+            second = self.play_innings(bowling_first, batting_first, runs,
+                                       wickets, balls, weak_shot_balls, innings=2)
+
+        if second["runs"] >= target:
+            winner = self.bowling_first
+        else:
+            winner = self.batting_first
+
+        return {
+            "first_innings": first,
+            "second_innings": second,
+            "target": target,
+            "winner": winner,
+            "tie": second["runs"] == target - 1
+        }
+
+
+# ----------------------------
+# VECTORISED ENGINE
+# ----------------------------
+def ranked_deliveries(batsman_rating):
+    """get_shot_ranking for every delivery at once, in COMBINATIONS order.
+
+    Returns (effective, shot) arrays of shape (deliveries, most shots),
+    each row sorted lowest effective score first, and the shot count of
+    each delivery (rows of smaller sheets are zero padded).
+    """
+    width = max(len(vocab["shots"]) for vocab in RATINGS.sheets.values())
+    effective_rows, shot_rows, counts = [], [], []
+
+    for bowling_type in RATINGS.bowling_types:
+        vocab = RATINGS.sheets[bowling_type]
+        columns = RATINGS.sheet_shot_columns[bowling_type]
+        ratings = RATINGS.cube[RATINGS.type_index[bowling_type]][np.ix_(
+            [RATINGS.line_index[v] for v in vocab["lines"]],
+            [RATINGS.length_index[v] for v in vocab["lengths"]],
+            [RATINGS.variation_index[v] for v in vocab["variations"]],
+            columns
+        )].reshape(-1, len(columns))
+
+        score = (
+            0.8 * ratings +
+            0.4 * batsman_rating -
+            0.2 * BOT_BOWLER_RATING
+        )
+        effective = np.clip(score.astype(int), 1, 100)
+        order = np.argsort(effective, axis=1, kind="stable")
+
+        padding = ((0, 0), (0, width - len(columns)))
+        effective_rows.append(np.pad(np.take_along_axis(effective, order, axis=1), padding))
+        shot_rows.append(np.pad(columns[order], padding))
+        counts.append(np.full(len(ratings), len(columns)))
+
+    return (np.concatenate(effective_rows), np.concatenate(shot_rows),
+            np.concatenate(counts))
+
+
+class BatchEngine:
+    """MatchEngine's rules for many matches at once, in numpy lockstep.
+
+    Every ball of every live match is played in one vectorised step, so
+    thousands of matches cost about as much Python as one. Outcomes follow
+    the same distributions as MatchEngine but use numpy's generator, so a
+    seed does not reproduce MatchEngine's matches ball for ball. Teams are
+    referred to by their index in `teams`.
+    """
+
+    def __init__(self, teams, overs=20, mode="medium", seed=None):
+        self.codes = list(teams)
+        self.overs = overs
+        self.mode = mode
+        self.rng = np.random.default_rng(seed)
+        squads = [teams[code] for code in self.codes]
+        self.squad_size = max(len(squad) for squad in squads)
+
+        # One ranking table per distinct batting rating
+        ratings = sorted({p["bat"] for squad in squads for p in squad})
+        tables = [ranked_deliveries(rating) for rating in ratings]
+        self.ranked_effective = np.stack([t[0] for t in tables]).astype(np.uint8)
+        self.ranked_class = np.stack([
+            np.array([max_runs_class(SHOT_MAX_RUNS.get(s, 4)) for s in RATINGS.shots])[t[1]]
+            for t in tables
+        ]).astype(np.uint8)
+        self.shot_counts = tables[0][2]
+
+        rating_index = {rating: i for i, rating in enumerate(ratings)}
+        self.batsman_table = np.array([
+            [rating_index[p["bat"]] for p in squad[:11]] for squad in squads])
+
+        orders = [[squad.index(p) for p in get_bowling_order(squad)] for squad in squads]
+        self.bowler_counts = np.array([len(order) for order in orders])
+        self.bowler_slots = np.array([
+            order + [0] * (self.squad_size - len(order)) for order in orders])
+
+        self.at_stumps = np.array([int(is_wicket_delivery(line, length))
+                                   for _, line, length, _ in COMBINATIONS.combinations])
+
+    def weak_ball_mask(self, count):
+        """pick_weak_shot_balls for `count` innings, as a boolean mask"""
+        total_balls = self.overs * 6
+        weak_percentage = WEAK_SHOT_PERCENTAGE.get(self.mode, WEAK_SHOT_PERCENTAGE["hard"])
+        weak_balls = max(1, int(total_balls * weak_percentage))
+
+        keys = self.rng.random((count, total_balls), dtype=np.float32)
+        chosen = np.argpartition(keys, weak_balls - 1, axis=1)[:, :weak_balls]
+        mask = np.zeros((count, total_balls), dtype=bool)
+        np.put_along_axis(mask, chosen, True, axis=1)
+        return mask
+
+    def play_innings(self, batting, bowling):
+        """Play one innings per (batting, bowling) pair of team indices"""
+        rng = self.rng
+        count = len(batting)
+        total_balls = self.overs * 6
+        weak = self.weak_ball_mask(count)
+
+        runs = np.zeros(count, dtype=np.int32)
+        wickets = np.zeros(count, dtype=np.int32)
+        balls = np.zeros(count, dtype=np.int32)
+        player = {key: np.zeros((count, self.squad_size), dtype=np.int32)
+                  for key in ("bat_runs", "bat_balls", "bat_outs",
+                              "bowl_balls", "bowl_runs", "bowl_wickets")}
+
+        live = np.arange(count)
+        while live.size:
+            batsman = wickets[live]
+            ball = balls[live]
+            deliveries = rng.integers(0, len(COMBINATIONS), size=live.size)
+
+            # choose_shot: a uniform pick from the weak or the strong third
+            n = self.shot_counts[deliveries]
+            low = np.where(weak[live, ball], 0, n * 2 // 3)
+            high = np.where(weak[live, ball], n // 3, n - 1)
+            pick = low + (rng.random(live.size) * (high - low + 1)).astype(int)
+
+            table = self.batsman_table[batting[live], batsman]
+            effective = self.ranked_effective[table, deliveries, pick].astype(int)
+            index = (effective, self.ranked_class[table, deliveries, pick],
+                     self.at_stumps[deliveries])
+            scored = OUTCOME_RUNS[index]
+            out = OUTCOME_WICKET_RISK[index] & (rng.integers(1, 101, size=live.size) > effective)
+            scored[out] = 0
+
+            bowler = self.bowler_slots[
+                bowling[live], (ball // 6) % self.bowler_counts[bowling[live]]]
+            player["bat_runs"][live, batsman] += scored
+            player["bat_balls"][live, batsman] += 1
+            player["bat_outs"][live, batsman] += out
+            player["bowl_balls"][live, bowler] += 1
+            player["bowl_runs"][live, bowler] += scored
+            player["bowl_wickets"][live, bowler] += out
+
+            runs[live] += scored
+            wickets[live] += out
+            balls[live] += 1
+            live = live[(balls[live] < total_balls) & (wickets[live] < 10)]
+
+        return {"runs": runs, "wickets": wickets, "balls": balls, **player}
+
+    def play(self, batting_first, bowling_first):
+        """Play whole matches, the second innings always played out"""
+        batting_first = np.asarray(batting_first)
+        bowling_first = np.asarray(bowling_first)
+        first = self.play_innings(batting_first, bowling_first)
+        second = self.play_innings(bowling_first, batting_first)
+
+        target = first["runs"] + 1
+        chased = second["runs"] >= target
+        return {
+            "first_innings": first,
+            "second_innings": second,
+            "target": target,
+            "winner": np.where(chased, bowling_first, batting_first),
+            "tie": second["runs"] == target - 1
+        }
+
+
+# ----------------------------
+# BULK SIMULATION
+# ----------------------------
+def new_summary():
+    return {"matches": 0, "wins": {}, "ties": 0,
+            "first_innings_runs": 0, "second_innings_runs": 0,
+            "first_innings_wickets": 0, "second_innings_wickets": 0,
+            "highest_total": 0, "lowest_total": None}
+
+
+def add_to_summary(summary, match):
+    summary["matches"] += 1
+    summary["wins"][match["winner"]] = summary["wins"].get(match["winner"], 0) + 1
+    summary["ties"] += match["tie"]
+
+    for key in ("first_innings", "second_innings"):
+        runs = match[key]["runs"]
+        summary[f"{key}_runs"] += runs
+        summary[f"{key}_wickets"] += match[key]["wickets"]
+        summary["highest_total"] = max(summary["highest_total"], runs)
+        if summary["lowest_total"] is None or runs < summary["lowest_total"]:
+            summary["lowest_total"] = runs
+
+
+def merge_summaries(summaries):
+    total = new_summary()
+    for summary in summaries:
+        if "stats" in total:
+            total["stats"].merge(summary["stats"])
+        elif "stats" in summary:
+            total["stats"] = summary["stats"]
+        total["matches"] += summary["matches"]
+        total["ties"] += summary["ties"]
+        for team, wins in summary["wins"].items():
+            total["wins"][team] = total["wins"].get(team, 0) + wins
+        for key in ("first_innings_runs", "second_innings_runs",
+                    "first_innings_wickets", "second_innings_wickets"):
+            total[key] += summary[key]
+        total["highest_total"] = max(total["highest_total"], summary["highest_total"])
+        if summary["lowest_total"] is not None and (
+                total["lowest_total"] is None or
+                summary["lowest_total"] < total["lowest_total"]):
+            total["lowest_total"] = summary["lowest_total"]
+    return total
+
+
+def simulate_matches(count, overs=20, mode="medium", batting_first="CSK",
+                     bowling_first="MI", seed=None, stats=False):
+    """Play `count` matches in this process and summarise them.
+
+    With `stats`, summary["stats"] is a MatchStats fed every ball.
+    """
+    aggregator = None
+    if stats:
+        aggregator = MatchStats({code: TEAMS[code] for code in (batting_first, bowling_first)})
+    engine = MatchEngine(overs, mode, batting_first, bowling_first,
+                         random.Random(seed),
+                         on_ball=aggregator.on_ball if aggregator else None)
+    summary = new_summary()
+    for _ in range(count):
+        add_to_summary(summary, engine.play_match())
+    if stats:
+        summary["stats"] = aggregator
+    return summary
+
+
+def _simulate_chunk(args):
+    return simulate_matches(*args)
+
+
+def run_simulation(matches, overs=20, mode="medium", batting_first="CSK",
+                   bowling_first="MI", workers=1, seed=None, chunk_size=500,
+                   stats=False):
+    """Spread `matches` over a process pool and merge the summaries"""
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    chunks = []
+    remaining = matches
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        # Each chunk gets its own seed so results do not depend on scheduling
+        chunks.append((count, overs, mode, batting_first, bowling_first,
+                       base_seed + len(chunks), stats))
+        remaining -= count
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            summaries = pool.map(_simulate_chunk, chunks)
+    else:
+        summaries = [_simulate_chunk(chunk) for chunk in chunks]
+
+    summary = merge_summaries(summaries)
+    played = max(1, summary["matches"])
+    summary.update({
+        "overs": overs,
+        "mode": mode,
+        "batting_first": batting_first,
+        "bowling_first": bowling_first,
+        "seed": base_seed,
+        "win_percentage": {team: round(100 * wins / played, 2)
+                           for team, wins in summary["wins"].items()},
+        "average_first_innings": round(summary["first_innings_runs"] / played, 2),
+        "average_second_innings": round(summary["second_innings_runs"] / played, 2)
+    })
+    if stats:
+        aggregator = summary.pop("stats")
+        summary["players"] = {
+            "runs": aggregator.leaderboard("runs"),
+            "wickets": aggregator.leaderboard("wickets"),
+            "strike_rate": aggregator.leaderboard("strike_rate", min_balls=matches),
+            "economy": aggregator.leaderboard("economy", min_balls=matches)
+        }
+        summary["deliveries"] = aggregator.delivery_summary()
+    return summary
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Simulate bot vs bot matches")
+    parser.add_argument("-n", "--matches", type=int, default=1000)
+    parser.add_argument("--overs", type=int, default=20)
+    parser.add_argument("--mode", choices=sorted(WEAK_SHOT_PERCENTAGE), default="medium")
+    parser.add_argument("--batting-first", choices=sorted(TEAMS), default="CSK")
+    parser.add_argument("--bowling-first", choices=sorted(TEAMS), default="MI")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--stats", action="store_true", help="add player leaderboards")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = run_simulation(
+        args.matches,
+        overs=args.overs,
+        mode=args.mode,
+        batting_first=args.batting_first,
+        bowling_first=args.bowling_first,
+        workers=args.workers,
+        seed=args.seed,
+        stats=args.stats
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,241 @@
+import os
+import pickle
+import secrets
+import shlex
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from metrics import timed
+
+DEFAULT_TTL = 4 * 60 * 60  # Abandoned matches are dropped after 4 hours
+DEFAULT_STORE = "sqlite:matches.db"
+
+
+# ----------------------------
+# In-Process Store
+# ----------------------------
+class MemoryMatchStore:
+    """Match state kept as live objects in this process, with TTL eviction.
+
+    Entries are ordered by last access, so expired ones are always at the
+    front and eviction never scans live matches.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self.matches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        while self.matches:
+            match_id, (expires, _) = next(iter(self.matches.items()))
+            if expires > now:
+                break
+            del self.matches[match_id]
+
+    def get(self, match_id):
+        now = time.time()
+        with self.lock:
+            self._evict(now)
+            entry = self.matches.get(match_id)
+            if entry is None:
+                return None
+            self.matches[match_id] = (now + self.ttl, entry[1])
+            self.matches.move_to_end(match_id)
+            return entry[1]
+
+    def set(self, match_id, data):
+        now = time.time()
+        with self.lock:
+            self.matches[match_id] = (now + self.ttl, data)
+            self.matches.move_to_end(match_id)
+            self._evict(now)
+
+    def delete(self, match_id):
+        with self.lock:
+            self.matches.pop(match_id, None)
+
+
+# ----------------------------
+# SQLite Store
+# ----------------------------
+class SQLiteMatchStore:
+    """Match state in a SQLite file shared by every gunicorn worker"""
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.local = threading.local()
+        self.last_sweep = 0
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "id TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS matches_expires ON matches (expires)")
+
+    def _connect(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            self.local.db = db
+        return db
+
+    def get(self, match_id):
+        db = self._connect()
+        row = db.execute(
+            "SELECT data FROM matches WHERE id = ? AND expires > ?",
+            (match_id, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, match_id, data):
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO matches (id, data, expires) VALUES (?, ?, ?)",
+                (match_id, pickle.dumps(data, pickle.HIGHEST_PROTOCOL), now + self.ttl)
+            )
+            if now - self.last_sweep > self.SWEEP_INTERVAL:
+                self.last_sweep = now
+                db.execute("DELETE FROM matches WHERE expires <= ?", (now,))
+
+    def delete(self, match_id):
+        with self._connect() as db:
+            db.execute("DELETE FROM matches WHERE id = ?", (match_id,))
+
+
+def web_workers():
+    """Worker processes gunicorn was started with, 1 outside gunicorn"""
+    workers = os.environ.get("WEB_CONCURRENCY", "1")
+    args = shlex.split(os.environ.get("GUNICORN_CMD_ARGS", ""))
+    if "gunicorn" in os.path.basename(sys.argv[0]):
+        args += sys.argv[1:]
+
+    for i, arg in enumerate(args):
+        if arg in ("-w", "--workers") and i + 1 < len(args):
+            workers = args[i + 1]
+        elif arg.startswith("--workers="):
+            workers = arg.split("=", 1)[1]
+        elif arg.startswith("-w") and arg[2:].isdigit():
+            workers = arg[2:]
+    return int(workers)
+
+
+def store_from_config(url=None, ttl=None):
+    """'sqlite:<path>' (default sqlite:matches.db) or 'memory', e.g. from MATCH_STORE"""
+    url = url or os.environ.get("MATCH_STORE", DEFAULT_STORE)
+    ttl = ttl or int(os.environ.get("MATCH_TTL", DEFAULT_TTL))
+
+    if url == "memory":
+        # Each worker would only see the matches it started itself
+        if web_workers() > 1:
+            raise ValueError("MATCH_STORE=memory needs a single worker, "
+                             "use sqlite:<path> with more than one")
+        return MemoryMatchStore(ttl)
+    if url.startswith("sqlite:"):
+        return SQLiteMatchStore(url[len("sqlite:"):], ttl)
+
+    raise ValueError(f"Unknown match store: {url}")
+
+
+# ----------------------------
+# Flask Session Interface
+# ----------------------------
+class MatchSession(CallbackDict, SessionMixin):
+
+    def __init__(self, initial=None, match_id=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.match_id = match_id
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+
+class MatchSessionInterface(SessionInterface):
+    """Keeps `session` server side, the cookie only carries a signed match id"""
+
+    salt = "match-id"
+
+    def __init__(self, store):
+        self.store = store
+
+    def get_signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        signed_id = request.cookies.get(self.get_cookie_name(app))
+        if signed_id:
+            try:
+                match_id = self.get_signer(app).unsign(signed_id).decode()
+            except BadSignature:
+                match_id = None
+
+            if match_id:
+                with timed("session_load"):
+                    data = self.store.get(match_id)
+                if data is not None:
+                    return MatchSession(data, match_id)
+
+        return MatchSession(match_id=secrets.token_urlsafe(12), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified and not session.new:
+                with timed("session_save"):
+                    self.store.delete(session.match_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified or session.new:
+            with timed("session_save"):
+                self.store.set(session.match_id, dict(session))
+
+        # The id never changes, so the cookie is only re-sent to refresh
+        # the expiry of permanent sessions
+        refresh = session.permanent and app.config["SESSION_REFRESH_EACH_REQUEST"]
+        if session.new or refresh:
+            response.set_cookie(
+                name,
+                self.get_signer(app).sign(session.match_id).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+
+# Opt-in, everything below is a no-op unless METRICS=1
+ENABLED = os.environ.get("METRICS", "0") not in ("", "0")
+
+# Histogram buckets in seconds, the per-ball phases sit well under 10ms
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+           0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+PREFIX = "ipl_"
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+class Metrics:
+    """Per-process timings by (route, phase) plus labelled counters.
+
+    Each gunicorn worker keeps its own registry, so scrape every worker
+    or read them as per-worker series.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (route, phase) -> [count per bucket..., +Inf count, sum]
+        self.timings = {}
+        # name -> {sorted label items: value}
+        self.counters = {}
+
+    def observe(self, phase, seconds, route=None):
+        key = (route or current_route(), phase)
+        with self.lock:
+            series = self.timings.get(key)
+            if series is None:
+                series = self.timings[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+            series[len(BUCKETS)] += 1
+            series[-1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            values = self.counters.setdefault(name, {})
+            values[key] = values.get(key, 0) + amount
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self.lock:
+            timings = {key: list(series) for key, series in self.timings.items()}
+            counters = {name: dict(values) for name, values in self.counters.items()}
+
+        lines = [
+            f"# HELP {PREFIX}phase_seconds Time spent per route in each hot path phase",
+            f"# TYPE {PREFIX}phase_seconds histogram"
+        ]
+        for (route, phase), series in sorted(timings.items()):
+            labels = f'route="{route}",phase="{phase}"'
+            for bound, value in zip(BUCKETS, series):
+                lines.append(f'{PREFIX}phase_seconds_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'{PREFIX}phase_seconds_bucket{{{labels},le="+Inf"}} {series[len(BUCKETS)]}')
+            lines.append(f"{PREFIX}phase_seconds_sum{{{labels}}} {series[-1]:.9f}")
+            lines.append(f"{PREFIX}phase_seconds_count{{{labels}}} {series[len(BUCKETS)]}")
+
+        for name, values in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            for key, value in sorted(values.items()):
+                labels = ",".join(f'{k}="{v}"' for k, v in key)
+                lines.append(f"{PREFIX}{name}_total{{{labels}}} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def current_route():
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return "none"
+
+
+def record(phase, seconds):
+    if (has_request_context() and request.url_rule is None
+            and request.routing_exception is None):
+        # The session opens before the request is routed, keep the timing
+        # until the route is known
+        g.setdefault("metrics_pending", []).append((phase, seconds))
+    else:
+        METRICS.observe(phase, seconds)
+
+
+def flush_pending():
+    for phase, seconds in g.pop("metrics_pending", ()):
+        METRICS.observe(phase, seconds)
+
+
+# ----------------------------
+# Instrumentation Helpers
+# ----------------------------
+class Timer:
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.phase, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def timed(phase):
+    """`with timed("phase"):` records the block, free when disabled"""
+    return Timer(phase) if ENABLED else NULL_TIMER
+
+
+def count(name, amount=1, **labels):
+    """Bump a counter, labelled with the current route"""
+    if ENABLED:
+        METRICS.inc(name, amount, route=current_route(), **labels)
+
+
+def instrument(phase, fn=None):
+    """Wrap `fn` so each call is timed as `phase`, returns `fn` when disabled.
+
+    Without `fn` it returns a decorator.
+    """
+    if fn is None:
+        return lambda fn: instrument(phase, fn)
+    if not ENABLED:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record(phase, time.perf_counter() - start)
+    return wrapper
+
+
+# ----------------------------
+# Flask Wiring
+# ----------------------------
+def init_app(app):
+    """Time whole requests and template renders, and serve /metrics"""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        flush_pending()
+        g.metrics_request_start = time.perf_counter()
+
+    @app.teardown_request
+    def stop_request_timer(exc):
+        flush_pending()
+        start = g.pop("metrics_request_start", None)
+        if start is not None:
+            METRICS.observe("request", time.perf_counter() - start)
+
+    def start_render(sender, template, context, **extra):
+        g.metrics_render_start = time.perf_counter()
+
+    def stop_render(sender, template, context, **extra):
+        start = g.pop("metrics_render_start", None)
+        if start is not None:
+            METRICS.observe("template_render", time.perf_counter() - start)
+
+    # Signals hold weak references, the app keeps the receivers alive
+    app.extensions["metrics"] = (start_render, stop_render)
+    before_render_template.connect(start_render, app)
+    template_rendered.connect(stop_render, app)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(METRICS.render(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
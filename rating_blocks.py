@@ -0,0 +1,393 @@
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import count
+
+# Block rating file layout:
+#   magic | compressed blocks ... | JSON footer | uint32 footer length | magic
+# The footer holds the dimension dictionaries, every sheet's vocabulary
+# and the block directory, so a reader maps the file and decodes blocks
+# only as lookups reach them.
+BLOCK_MAGIC = b"IPLBLKS1"
+FOOTER_TAIL = struct.Struct("<I8s")
+
+# Rows per block at most, a (bowling_type, line) with more spans blocks
+BLOCK_ROWS = 4096
+
+# Rows the importer holds before it flushes the biggest pending block
+MAX_BUFFERED_ROWS = 65536
+
+# Decoded blocks kept per store
+BLOCK_CACHE_SIZE = 64
+
+CSV_KEYS = ("bowling_type", "line", "length", "variation")
+
+
+# ----------------------------
+# Streaming Importer
+# ----------------------------
+class BlockWriter:
+    """Writes a block rating file from rows arriving in any order.
+
+    Dimension values are dictionary encoded as they first appear. Rows
+    are grouped into blocks per (bowling_type, line); a block is written
+    out when it is full, and when too many rows are pending the biggest
+    pending block goes first, so memory stays bounded whatever the input
+    size or order.
+    """
+
+    def __init__(self, path, block_rows=BLOCK_ROWS, max_buffered_rows=MAX_BUFFERED_ROWS):
+        self.path = path
+        self.tmp_path = f"{path}.tmp{os.getpid()}"
+        self.block_rows = block_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.vocab = {key: {} for key in ("bowling_types", "lines", "lengths", "variations", "shots")}
+        self.sheets = {}
+        self.sheet_columns = {}
+        self.pending = {}
+        self.buffered = 0
+        self.blocks = []
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(BLOCK_MAGIC)
+
+    def code(self, key, value):
+        return self.vocab[key].setdefault(value, len(self.vocab[key]))
+
+    def add_sheet(self, bowling_type, shots):
+        """Declare a bowling type and its shot columns, before its rows"""
+        if bowling_type in self.sheets:
+            return
+        self.code("bowling_types", bowling_type)
+        # Dicts keep first-appearance order with O(1) membership
+        self.sheets[bowling_type] = {"shots": list(shots), "lines": {},
+                                     "lengths": {}, "variations": {}}
+        self.sheet_columns[bowling_type] = [self.code("shots", s) for s in shots]
+
+    def add_row(self, bowling_type, line, length, variation, ratings):
+        sheet = self.sheets[bowling_type]
+        for key, value in (("lines", line), ("lengths", length), ("variations", variation)):
+            sheet[key].setdefault(value)
+
+        shots = len(sheet["shots"])
+        values = bytes(int(r or 0) for r in list(ratings)[:shots]).ljust(shots, b"\0")
+        key = (self.vocab["bowling_types"][bowling_type], self.code("lines", line))
+        rows = self.pending.setdefault(key, [])
+        rows.append((self.code("lengths", length), self.code("variations", variation), values))
+        self.buffered += 1
+
+        if len(rows) >= self.block_rows:
+            self.flush(key)
+        elif self.buffered > self.max_buffered_rows:
+            self.flush(max(self.pending, key=lambda k: len(self.pending[k])))
+
+    def flush(self, key):
+        rows = self.pending.pop(key)
+        self.buffered -= len(rows)
+
+        lengths = np.array([r[0] for r in rows], dtype="<u2")
+        variations = np.array([r[1] for r in rows], dtype="<u2")
+        payload = zlib.compress(lengths.tobytes() + variations.tobytes() +
+                                b"".join(r[2] for r in rows))
+
+        offset = self.file.tell()
+        self.file.write(payload)
+        self.blocks.append([key[0], key[1], offset, len(payload), len(rows),
+                            zlib.crc32(payload)])
+
+    def close(self, source=None):
+        """Write the footer and move the finished file into place"""
+        for key in list(self.pending):
+            self.flush(key)
+
+        footer = json.dumps({
+            "source": source,
+            "bowling_types": list(self.vocab["bowling_types"]),
+            "lines": list(self.vocab["lines"]),
+            "lengths": list(self.vocab["lengths"]),
+            "variations": list(self.vocab["variations"]),
+            "shots": list(self.vocab["shots"]),
+            "sheets": {sheet: {key: list(values) for key, values in vocab.items()}
+                       for sheet, vocab in self.sheets.items()},
+            # [type code, line code, offset, size, rows, crc32]
+            "blocks": self.blocks
+        }).encode("utf-8")
+        self.file.write(footer)
+        self.file.write(FOOTER_TAIL.pack(len(footer), BLOCK_MAGIC))
+        self.file.close()
+
+        # Write then rename so running workers never map a partial file
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+def iter_xlsx_rows(path):
+    """(bowling_type, shots) then (bowling_type, row) items, one row at a time"""
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True)
+    try:
+        for sheet in wb.sheetnames:
+            shots = None
+            for row in wb[sheet].iter_rows(values_only=True):
+                if row[0] is None:
+                    continue
+                if shots is None:
+                    shots = list(row[3:])
+                    yield sheet, shots
+                else:
+                    yield sheet, row
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(path):
+    """Same items as iter_xlsx_rows from one wide CSV.
+
+    Columns are bowling_type, line, length, variation and then one column
+    per shot. A bowling type plays the shots that are filled in on its
+    first row.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if tuple(h.strip().lower() for h in header[:4]) != CSV_KEYS:
+            raise ValueError(f"{path} must start with the columns {', '.join(CSV_KEYS)}")
+
+        all_shots = header[4:]
+        columns = {}
+        for row in reader:
+            if not row or not row[0]:
+                continue
+            bowling_type = row[0]
+            if bowling_type not in columns:
+                columns[bowling_type] = [i for i, v in enumerate(row[4:]) if v.strip()]
+                yield bowling_type, [all_shots[i] for i in columns[bowling_type]]
+            values = row[4:]
+            yield bowling_type, [*row[1:4], *(int(values[i] or 0) for i in columns[bowling_type])]
+
+
+def import_ratings(source_path, block_path, **options):
+    """Convert an xlsx or CSV rating source into a block rating file"""
+    rows = iter_csv_rows if source_path.lower().endswith(".csv") else iter_xlsx_rows
+    writer = BlockWriter(block_path, **options)
+    try:
+        for bowling_type, item in rows(source_path):
+            if bowling_type not in writer.sheets:
+                writer.add_sheet(bowling_type, item)
+            else:
+                writer.add_row(bowling_type, item[0], item[1], item[2], item[3:])
+    except BaseException:
+        writer.abort()
+        raise
+
+    stat = os.stat(source_path)
+    return writer.close({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+
+
+# ----------------------------
+# Block Rating Store
+# ----------------------------
+class DecodedBlock:
+    __slots__ = ("rows", "ratings")
+
+    def __init__(self, payload, count_rows, shots):
+        data = zlib.decompress(payload)
+        keys = np.frombuffer(data, dtype="<u2", count=2 * count_rows).reshape(2, count_rows)
+        self.ratings = np.frombuffer(data, dtype=np.uint8, offset=4 * count_rows).reshape(count_rows, shots)
+        self.rows = {(int(length), int(variation)): i
+                     for i, (length, variation) in enumerate(zip(*keys))}
+
+
+class BlockRatingStore:
+    """Ratings read block by block from a compressed block file.
+
+    Answers the same lookups as RatingStore: rating() and shot_vector()
+    decode only the block of their (bowling_type, line) and keep recent
+    blocks in an LRU, scan() walks blocks in file order for batch work.
+    `cube` builds the dense RatingStore cube on first use, for the bulk
+    tools that need every rating at once.
+    """
+
+    def __init__(self, path, cache_size=BLOCK_CACHE_SIZE):
+        self.path = path
+        with open(path, "rb") as f:
+            # The mapping stays valid after the file is closed
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        footer_length, magic = FOOTER_TAIL.unpack_from(self.buffer, len(self.buffer) - FOOTER_TAIL.size)
+        if magic != BLOCK_MAGIC or self.buffer[:len(BLOCK_MAGIC)] != BLOCK_MAGIC:
+            raise ValueError(f"{path} is not a block rating file")
+        footer_start = len(self.buffer) - FOOTER_TAIL.size - footer_length
+        footer_bytes = self.buffer[footer_start:footer_start + footer_length]
+        self.header = json.loads(footer_bytes.decode("utf-8"))
+        self.digest = hashlib.blake2b(footer_bytes, digest_size=6).hexdigest()
+
+        self.bowling_types = self.header["bowling_types"]
+        self.lines = self.header["lines"]
+        self.lengths = self.header["lengths"]
+        self.variations = self.header["variations"]
+        self.shots = self.header["shots"]
+        self.sheets = self.header["sheets"]
+
+        self.type_index = {v: i for i, v in enumerate(self.bowling_types)}
+        self.line_index = {v: i for i, v in enumerate(self.lines)}
+        self.length_index = {v: i for i, v in enumerate(self.lengths)}
+        self.variation_index = {v: i for i, v in enumerate(self.variations)}
+        self.shot_index = {v: i for i, v in enumerate(self.shots)}
+        self.sheet_shot_columns = {
+            sheet: np.array([self.shot_index[s] for s in vocab["shots"]])
+            for sheet, vocab in self.sheets.items()
+        }
+        self.sheet_shot_position = {
+            sheet: {s: i for i, s in enumerate(vocab["shots"])}
+            for sheet, vocab in self.sheets.items()
+        }
+
+        self.blocks = self.header["blocks"]
+        self.block_ids = {}
+        for i, (t, l, *_) in enumerate(self.blocks):
+            self.block_ids.setdefault((t, l), []).append(i)
+
+        self.cache_size = cache_size
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+        self._cube = None
+
+    @property
+    def shape(self):
+        return (len(self.bowling_types), len(self.lines), len(self.lengths),
+                len(self.variations), len(self.shots))
+
+    def block(self, i):
+        """Decoded block `i`, from the LRU when it is warm"""
+        with self._lock:
+            decoded = self._decoded.get(i)
+            if decoded is not None:
+                self._decoded.move_to_end(i)
+                return decoded
+
+        t, _, offset, size, rows, _ = self.blocks[i]
+        count("rating_blocks_decoded")
+        decoded = DecodedBlock(self.buffer[offset:offset + size], rows,
+                               len(self.sheets[self.bowling_types[t]]["shots"]))
+        with self._lock:
+            self._decoded[i] = decoded
+            while len(self._decoded) > self.cache_size:
+                self._decoded.popitem(last=False)
+        return decoded
+
+    def delivery_index(self, bowling_type, line, length, variation):
+        """Cube coordinates of a delivery, raises ValueError if unknown"""
+        try:
+            return (self.type_index[bowling_type],
+                    self.line_index[line],
+                    self.length_index[length],
+                    self.variation_index[variation])
+        except KeyError:
+            raise ValueError("Combination not found in Excel")
+
+    def _row(self, bowling_type, line, length, variation):
+        t, l, length_code, variation_code = self.delivery_index(bowling_type, line, length, variation)
+        for i in self.block_ids.get((t, l), ()):
+            decoded = self.block(i)
+            row = decoded.rows.get((length_code, variation_code))
+            if row is not None:
+                return decoded.ratings[row]
+        raise ValueError("Combination not found in Excel")
+
+    def rating(self, bowling_type, line, length, variation, shot_type):
+        """Rating of one shot, raises ValueError for unknown combinations"""
+        count("rating_lookups", kind="shot")
+        ratings = self._row(bowling_type, line, length, variation)
+        position = self.sheet_shot_position[bowling_type].get(shot_type)
+        if position is None:
+            raise ValueError("Combination not found in Excel")
+
+        value = ratings[position]
+        if not value:
+            raise ValueError("Combination not found in Excel")
+
+        return int(value)
+
+    def shot_vector(self, bowling_type, line, length, variation):
+        """Ratings of every shot of a sheet, in its column order"""
+        count("rating_lookups", kind="delivery")
+        ratings = self._row(bowling_type, line, length, variation)
+        if not ratings.all():
+            raise ValueError("Combination not found in Excel")
+
+        return self.sheets[bowling_type]["shots"], ratings
+
+    def scan(self, bowling_type=None):
+        """(bowling_type, line, lengths, variations, ratings) per block.
+
+        Blocks are decoded one after another without entering the LRU;
+        ratings has a row per (length, variation) in the sheet's shot order.
+        """
+        t_filter = None if bowling_type is None else self.type_index[bowling_type]
+        for t, l, offset, size, rows, _ in self.blocks:
+            if t_filter is not None and t != t_filter:
+                continue
+            sheet = self.bowling_types[t]
+            decoded = DecodedBlock(self.buffer[offset:offset + size], rows,
+                                   len(self.sheets[sheet]["shots"]))
+            keys = list(decoded.rows)
+            yield (sheet, self.lines[l],
+                   [self.lengths[k[0]] for k in keys],
+                   [self.variations[k[1]] for k in keys],
+                   decoded.ratings)
+
+    @property
+    def cube(self):
+        """Dense (bowling_type, line, length, variation, shot) cube, built once"""
+        if self._cube is None:
+            cube = np.zeros(self.shape, dtype=np.uint8)
+            for t, l, offset, size, rows, _ in self.blocks:
+                sheet = self.bowling_types[t]
+                decoded = DecodedBlock(self.buffer[offset:offset + size], rows,
+                                       len(self.sheets[sheet]["shots"]))
+                keys = np.array(list(decoded.rows), dtype=int).reshape(-1, 2)
+                cube[t, l, keys[:, 0, None], keys[:, 1, None],
+                     self.sheet_shot_columns[sheet][None, :]] = decoded.ratings
+            cube.flags.writeable = False
+            self._cube = cube
+        return self._cube
+
+    def __reduce__(self):
+        # The mapping and lock cannot be pickled, the copy maps the file again
+        return type(self), (self.path, self.cache_size)
+
+    @classmethod
+    def load(cls, path):
+        return cls(path)
+
+
+def is_block_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC
+    except OSError:
+        return False
+
+
+def read_block_source(path):
+    """Source stamp recorded in a block rating file's footer"""
+    with open(path, "rb") as f:
+        f.seek(-FOOTER_TAIL.size, os.SEEK_END)
+        footer_length, magic = FOOTER_TAIL.unpack(f.read(FOOTER_TAIL.size))
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"{path} is not a block rating file")
+        f.seek(-FOOTER_TAIL.size - footer_length, os.SEEK_END)
+        return json.loads(f.read(footer_length).decode("utf-8"))["source"]
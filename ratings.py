@@ -0,0 +1,299 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from metrics import count
+
+# Compiled rating file layout:
+#   magic | uint32 header length | JSON header | padding | uint8 cube
+BINARY_MAGIC = b"IPLRATE1"
+BINARY_ALIGN = 64
+
+
+# ----------------------------
+# Rating Store
+# ----------------------------
+class RatingStore:
+    """Shot ratings for every sheet packed into one dense uint8 cube.
+
+    Axes are (bowling_type, line, length, variation, shot). Each axis uses
+    one vocabulary shared by all sheets, so a combination that a sheet does
+    not have is stored as 0 (real ratings are 1-100).
+    """
+
+    def __init__(self, bowling_types, lines, lengths, variations, shots,
+                 cube, sheets):
+        self.bowling_types = list(bowling_types)
+        self.lines = list(lines)
+        self.lengths = list(lengths)
+        self.variations = list(variations)
+        self.shots = list(shots)
+        self.cube = cube
+        # Per sheet vocabularies in the order they appear in the workbook
+        self.sheets = sheets
+
+        self.type_index = {v: i for i, v in enumerate(self.bowling_types)}
+        self.line_index = {v: i for i, v in enumerate(self.lines)}
+        self.length_index = {v: i for i, v in enumerate(self.lengths)}
+        self.variation_index = {v: i for i, v in enumerate(self.variations)}
+        self.shot_index = {v: i for i, v in enumerate(self.shots)}
+        self.sheet_shot_columns = {
+            sheet: np.array([self.shot_index[s] for s in vocab["shots"]])
+            for sheet, vocab in sheets.items()
+        }
+
+    @classmethod
+    def from_xlsx(cls, path):
+        """Build the store from an xlsx file"""
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True)
+        try:
+            return cls.from_workbook(wb)
+        finally:
+            wb.close()
+
+    @classmethod
+    def from_workbook(cls, wb):
+        """Build the store from an openpyxl workbook"""
+        bowling_types = list(wb.sheetnames)
+        vocab = {"lines": {}, "lengths": {}, "variations": {}, "shots": {}}
+        sheets = {}
+        rows_by_type = {}
+
+        for sheet in bowling_types:
+            rows = [row for row in wb[sheet].iter_rows(values_only=True)
+                    if row[0] is not None]
+            shots = list(rows[0][3:])
+            sheet_vocab = {"shots": shots, "lines": [],
+                           "lengths": [], "variations": []}
+
+            for row in rows[1:]:
+                for key, value in zip(("lines", "lengths", "variations"), row):
+                    if value not in sheet_vocab[key]:
+                        sheet_vocab[key].append(value)
+
+            for key, values in sheet_vocab.items():
+                for value in values:
+                    vocab[key].setdefault(value, len(vocab[key]))
+
+            sheets[sheet] = sheet_vocab
+            rows_by_type[sheet] = rows[1:]
+
+        cube = np.zeros(
+            (len(bowling_types), len(vocab["lines"]), len(vocab["lengths"]),
+             len(vocab["variations"]), len(vocab["shots"])),
+            dtype=np.uint8
+        )
+
+        for t, sheet in enumerate(bowling_types):
+            shot_cols = [vocab["shots"][s] for s in sheets[sheet]["shots"]]
+            for row in rows_by_type[sheet]:
+                cell = cube[t,
+                            vocab["lines"][row[0]],
+                            vocab["lengths"][row[1]],
+                            vocab["variations"][row[2]]]
+                cell[shot_cols] = row[3:3 + len(shot_cols)]
+
+        return cls(bowling_types, vocab["lines"], vocab["lengths"],
+                   vocab["variations"], vocab["shots"], cube, sheets)
+
+    def delivery_index(self, bowling_type, line, length, variation):
+        """Cube coordinates of a delivery, raises ValueError if unknown"""
+        try:
+            return (self.type_index[bowling_type],
+                    self.line_index[line],
+                    self.length_index[length],
+                    self.variation_index[variation])
+        except KeyError:
+            raise ValueError("Combination not found in Excel")
+
+    def rating(self, bowling_type, line, length, variation, shot_type):
+        """O(1) rating lookup, raises ValueError for unknown combinations"""
+        count("rating_lookups", kind="shot")
+        index = self.delivery_index(bowling_type, line, length, variation)
+        if shot_type not in self.shot_index:
+            raise ValueError("Combination not found in Excel")
+
+        value = self.cube[index + (self.shot_index[shot_type],)]
+        if not value:
+            raise ValueError("Combination not found in Excel")
+
+        return int(value)
+
+    def shot_vector(self, bowling_type, line, length, variation):
+        """Ratings of every shot of a sheet, in its column order"""
+        count("rating_lookups", kind="delivery")
+        index = self.delivery_index(bowling_type, line, length, variation)
+        ratings = self.cube[index][self.sheet_shot_columns[bowling_type]]
+        if not ratings.all():
+            raise ValueError("Combination not found in Excel")
+
+        return self.sheets[bowling_type]["shots"], ratings
+
+    # ----------------------------
+    # Compiled Binary Format
+    # ----------------------------
+    def save(self, path, source_path=None):
+        """Write the store as a compiled rating file"""
+        header = {
+            "source": source_stamp(source_path) if source_path else None,
+            "shape": list(self.cube.shape),
+            "bowling_types": self.bowling_types,
+            "lines": self.lines,
+            "lengths": self.lengths,
+            "variations": self.variations,
+            "shots": self.shots,
+            "sheets": self.sheets
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = len(BINARY_MAGIC) + 4 + len(header_bytes)
+        padding = -data_offset % BINARY_ALIGN
+
+        # Write then rename so running workers never map a partial file
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(BINARY_MAGIC)
+            f.write(struct.pack("<I", len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b"\0" * padding)
+            f.write(np.ascontiguousarray(self.cube, dtype=np.uint8).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a compiled rating file read-only"""
+        header, data_offset = read_binary_header(path)
+
+        with open(path, "rb") as f:
+            # The mapping stays valid after the file is closed, and every
+            # worker mapping the same file shares its pages
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        shape = tuple(header["shape"])
+        cube = np.frombuffer(
+            buffer,
+            dtype=np.uint8,
+            count=int(np.prod(shape)),
+            offset=data_offset
+        ).reshape(shape)
+
+        return cls(header["bowling_types"], header["lines"], header["lengths"],
+                   header["variations"], header["shots"], cube,
+                   header["sheets"])
+
+
+# ----------------------------
+# Loading Helpers
+# ----------------------------
+def binary_path_for(xlsx_path):
+    return os.path.splitext(xlsx_path)[0] + ".ratings"
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_binary_header(path):
+    """Return (header dict, cube offset) of a compiled rating file"""
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a compiled rating file")
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    data_offset = len(BINARY_MAGIC) + 4 + header_length
+    data_offset += -data_offset % BINARY_ALIGN
+    return header, data_offset
+
+
+def read_source(path):
+    """Source stamp of a compiled rating file, dense or block format"""
+    from rating_blocks import is_block_file, read_block_source
+    if is_block_file(path):
+        return read_block_source(path)
+    header, _ = read_binary_header(path)
+    return header["source"]
+
+
+def load_compiled(path):
+    """Open a compiled rating file in whichever format it was written"""
+    from rating_blocks import BlockRatingStore, is_block_file
+    if is_block_file(path):
+        return BlockRatingStore.load(path)
+    return RatingStore.load(path)
+
+
+def is_binary_fresh(xlsx_path, binary_path):
+    """True if the compiled file exists and was built from this xlsx"""
+    try:
+        source = read_source(binary_path)
+    except (OSError, ValueError):
+        return False
+
+    if not os.path.exists(xlsx_path):
+        # Deployed without the workbook, the compiled file is all we have
+        return True
+
+    return source == source_stamp(xlsx_path)
+
+
+def load_ratings(xlsx_path, binary_path=None):
+    """Map the compiled ratings, or parse the xlsx when they are stale"""
+    binary_path = binary_path or binary_path_for(xlsx_path)
+
+    if is_binary_fresh(xlsx_path, binary_path):
+        count("workbook_loads", source="binary")
+        return load_compiled(binary_path)
+
+    count("workbook_loads", source="xlsx")
+    return RatingStore.from_xlsx(xlsx_path)
+
+
+_stores = {}
+
+
+def open_ratings(xlsx_path):
+    """Process-wide store for a workbook, loaded on first use"""
+    if xlsx_path not in _stores:
+        _stores[xlsx_path] = load_ratings(xlsx_path)
+    return _stores[xlsx_path]
+
+
+def compile_ratings(xlsx_path, binary_path=None, blocks=None):
+    """Compile an xlsx workbook (or a CSV, blocks only) into a rating file.
+
+    `blocks` picks the compressed block format over the dense cube, None
+    keeps the format of the file being replaced.
+    """
+    binary_path = binary_path or binary_path_for(xlsx_path)
+    if blocks is None:
+        from rating_blocks import is_block_file
+        blocks = is_block_file(binary_path) or xlsx_path.lower().endswith(".csv")
+
+    if blocks:
+        from rating_blocks import import_ratings
+        return import_ratings(xlsx_path, binary_path)
+
+    RatingStore.from_xlsx(xlsx_path).save(binary_path, source_path=xlsx_path)
+    return binary_path
+
+
+# ----------------------------
+# BUILD STEP
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compile rating data for fast loading")
+    parser.add_argument("source", nargs="?", default="Auto_Filled_Bowling_Data.xlsx",
+                        help="xlsx workbook or wide CSV")
+    parser.add_argument("target", nargs="?", help="defaults to <source>.ratings")
+    parser.add_argument("--blocks", action="store_true", default=None,
+                        help="write the compressed block format, for large rating sets")
+    args = parser.parse_args()
+
+    print(f"Compiled {args.source} -> {compile_ratings(args.source, args.target, args.blocks)}")
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import json
+import random
+import struct
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from combinations import COMBINATIONS
+from shot import (
+    RATINGS,
+    OUTCOMES,
+    OUTCOME_RUNS,
+    OUTCOME_WICKET_RISK,
+    SHOT_MAX_RUNS,
+    max_runs_class,
+    is_wicket_delivery
+)
+from snapshots import RatingSnapshot, load_snapshot
+
+MODES = ("easy", "medium", "hard")
+DECISIONS = ("bat", "bowl")
+
+# Log layout: header, then one fixed size record per ball
+REPLAY_MAGIC = b"IPLRPLY2"
+HEADER = struct.Struct("<8sQHBB6s")    # magic, seed, overs, mode, decision, ratings version
+
+RECORD = struct.Struct("<BHHBBBBBB")   # see RECORD_DTYPE
+RECORD_DTYPE = np.dtype([
+    ("innings", "u1"),
+    ("ball", "<u2"),          # ball number within the innings, from 1
+    ("delivery", "<u2"),      # index into the snapshot's combinations
+    ("shot", "u1"),           # index into the snapshot's ratings.shots
+    ("batsman", "u1"),        # batting rating used
+    ("bowler", "u1"),         # bowling rating used
+    ("effective", "u1"),
+    ("roll", "u1"),           # the ball's wicket roll, 1-100
+    ("result", "u1")          # index into OUTCOMES
+])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+# ----------------------------
+# Seeded Generators
+# ----------------------------
+def derive_seed(seed, stream, *keys):
+    """64-bit seed for one named stream of a match, e.g. ("shot", innings, ball)"""
+    text = ":".join(str(part) for part in (seed, stream) + keys)
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def match_rng(seed, stream, *keys):
+    """Fresh generator for one decision of one match.
+
+    Every decision gets its own stream, so a match replays identically no
+    matter how often a page re-asks for a choice, and outcome rolls never
+    shift when bot choice logic changes. Nothing is shared between
+    requests or threads.
+    """
+    return random.Random(derive_seed(seed, stream, *keys))
+
+
+def wicket_roll(seed, innings, ball):
+    """The roll resolve_outcome draws for a ball from its outcome stream"""
+    return match_rng(seed, "outcome", innings, ball).randint(1, 100)
+
+
+# ----------------------------
+# Replay Log
+# ----------------------------
+def new_log(seed, overs, mode, decision, ratings_version):
+    """Empty log of a match played on the snapshot `ratings_version`"""
+    if decision not in DECISIONS:
+        raise ValueError(f"Toss decision must be one of {DECISIONS}, got {decision!r}")
+    return bytearray(HEADER.pack(REPLAY_MAGIC, seed, overs,
+                                 MODES.index(mode) if mode in MODES else MODES.index("hard"),
+                                 DECISIONS.index(decision),
+                                 bytes.fromhex(ratings_version)))
+
+
+def append_ball(log, innings, ball, delivery, shot, batsman_rating,
+                bowler_rating, effective, roll, result,
+                combinations=COMBINATIONS, ratings=RATINGS):
+    """Add one 11 byte record, `delivery` is (bowling_type, line, length, variation)"""
+    log += RECORD.pack(innings, ball, combinations.index[tuple(delivery)],
+                       ratings.shot_index[shot], batsman_rating, bowler_rating,
+                       effective, roll, OUTCOMES.index(result))
+
+
+def read_log(data):
+    """(header dict, structured array of records) of one replay log"""
+    if bytes(data[:len(REPLAY_MAGIC)]) != REPLAY_MAGIC:
+        raise ValueError("Not a replay log")
+
+    _, seed, overs, mode, decision, version = HEADER.unpack_from(data)
+    header = {"seed": seed, "overs": overs, "mode": MODES[mode],
+              "decision": DECISIONS[decision], "ratings_version": version.hex()}
+    records = np.frombuffer(bytes(data), dtype=RECORD_DTYPE, offset=HEADER.size)
+    return header, records
+
+
+# ----------------------------
+# Bulk Re-simulation
+# ----------------------------
+@lru_cache(maxsize=8)
+def _lookup_arrays(ratings, combinations):
+    """Cube coordinates per combination, max runs class per shot and
+    wicket lines per (line, length), aligned with the record indices"""
+    coordinates = np.array([ratings.delivery_index(*c) for c in combinations.combinations])
+    classes = np.array([max_runs_class(SHOT_MAX_RUNS.get(shot, 4)) for shot in ratings.shots])
+    at_stumps = np.array([[is_wicket_delivery(line, length) for length in ratings.lengths]
+                          for line in ratings.lines], dtype=int)
+    return coordinates, classes, at_stumps
+
+
+def resimulate(records, ratings=RATINGS, combinations=COMBINATIONS):
+    """Replay any number of balls in one vectorised pass.
+
+    Recomputes every ball's effective score from the rating cube and its
+    outcome from the outcome table and the recorded roll. Returns
+    (effective, result) arrays to compare with the records, which must
+    come from matches played on these ratings.
+    """
+    coordinates, classes, at_stumps = _lookup_arrays(ratings, combinations)
+
+    cell = coordinates[records["delivery"]]
+    shot = records["shot"].astype(int)
+    rating = ratings.cube[cell[:, 0], cell[:, 1], cell[:, 2], cell[:, 3], shot]
+
+    score = (
+        0.8 * rating +
+        0.4 * records["batsman"] -
+        0.2 * records["bowler"]
+    )
+    effective = np.clip(score.astype(int), 1, 100)
+
+    index = (effective, classes[shot], at_stumps[cell[:, 1], cell[:, 2]])
+    runs = OUTCOME_RUNS[index]
+    wicket = OUTCOME_WICKET_RISK[index] & (records["roll"] > effective)
+
+    result = np.searchsorted(np.array(OUTCOMES[:4]), runs)
+    result[wicket] = OUTCOMES.index("W")
+    return effective, result
+
+
+@lru_cache(maxsize=1)
+def default_snapshot():
+    """Snapshot of the ratings this process loaded"""
+    return RatingSnapshot(RATINGS, combinations=COMBINATIONS)
+
+
+def verify_logs(logs, snapshots=None):
+    """Re-simulate many logs at once, returns a summary with mismatches.
+
+    Every log is checked against the ratings it was played on, found by
+    version in `snapshots` (version -> RatingSnapshot, by default only the
+    ratings this process loaded). Logs whose ratings are not available are
+    listed as unverified, not as mismatched.
+    """
+    default = default_snapshot()
+    snapshots = snapshots or {default.version: default}
+
+    groups = {}
+    all_records = []
+    unverified = []
+    for i, data in enumerate(logs):
+        header, records = read_log(data)
+        all_records.append(records)
+        snapshot = snapshots.get(header["ratings_version"])
+        if snapshot is None:
+            unverified.append(i)
+            continue
+        group = groups.setdefault(snapshot.version, (snapshot, [], []))
+        group[1].append(records)
+        group[2].append(np.full(len(records), i))
+
+    mismatched_balls = 0
+    mismatched_logs = set()
+    for snapshot, parts, owners in groups.values():
+        records = np.concatenate(parts)
+        owner = np.concatenate(owners)
+        effective, result = resimulate(records, snapshot.ratings, snapshot.combinations)
+        bad = (effective != records["effective"]) | (result != records["result"])
+        mismatched_balls += int(bad.sum())
+        mismatched_logs.update(int(i) for i in owner[bad])
+
+    records = np.concatenate(all_records) if all_records else np.empty(0, RECORD_DTYPE)
+    return {
+        "logs": len(logs),
+        "balls": int(len(records)),
+        "mismatched_balls": mismatched_balls,
+        "mismatched_logs": sorted(mismatched_logs),
+        "unverified_logs": unverified,
+        "runs": int(np.array([0, 2, 4, 6, 0])[records["result"]].sum()),
+        "wickets": int((records["result"] == OUTCOMES.index("W")).sum())
+    }
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Re-simulate replay logs and report any drift")
+    parser.add_argument("logs", nargs="+", help="replay files downloaded from /replay")
+    parser.add_argument("--workbook", action="append", default=[],
+                        help="earlier rating workbook some matches were played on, repeatable")
+    args = parser.parse_args()
+
+    logs = []
+    for path in args.logs:
+        with open(path, "rb") as f:
+            logs.append(f.read())
+
+    snapshots = {snapshot.version: snapshot
+                 for snapshot in [default_snapshot()] + [load_snapshot(p) for p in args.workbook]}
+    summary = verify_logs(logs, snapshots)
+    summary["mismatched_logs"] = [args.logs[i] for i in summary["mismatched_logs"]]
+    summary["unverified_logs"] = [args.logs[i] for i in summary["unverified_logs"]]
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if summary["mismatched_balls"] or summary["unverified_logs"] else 0)
@@ -1,8 +1,18 @@
 import random
-from openpyxl import load_workbook
+import threading
+import weakref
+from collections import OrderedDict
+from functools import wraps
+
+import numpy as np
+from ratings import open_ratings
 
 FILE_PATH = "Auto_Filled_Bowling_Data.xlsx"
-wb = load_workbook(FILE_PATH)
+
+# Loaded once per process, rating lookups use it unless they are handed
+# another store (the web app passes each match's rating snapshot).
+# Maps the compiled .ratings file when it is up to date with the xlsx.
+RATINGS = open_ratings(FILE_PATH)
 
 # ----------------------------
 # Shot Maximum Runs Map
@@ -33,6 +43,11 @@ SHOT_MAX_RUNS = {
 }
 
 
+# Deliveries that can take a wicket off a low scoring shot
+STUMP_LINES = ["Off Stump", "Middle Stump", "Leg Stump"]
+WICKET_LENGTHS = ["Yorker", "Good Length", "Full"]
+
+
 # ----------------------------
 # Clamp Score
 # ----------------------------
@@ -41,29 +56,23 @@ def clamp(value):
 
 
 # ----------------------------
-# Read Shot Rating from Excel
+# Read Shot Rating
 # ----------------------------
 def get_shot_rating(
         bowling_type,
         line,
         length,
         variation,
-        shot_type):
+        shot_type,
+        ratings=None):
 
-    wb = load_workbook(FILE_PATH)
-    ws = wb[bowling_type]
-
-    headers = [cell.value for cell in ws[1]]
-    shot_col_index = headers.index(shot_type)
-
-    for row in ws.iter_rows(min_row=2):
-        if (row[0].value == line and
-                row[1].value == length and
-                row[2].value == variation):
-
-            return row[shot_col_index].value
-
-    raise ValueError("Combination not found in Excel")
+    return (ratings or RATINGS).rating(
+        bowling_type,
+        line,
+        length,
+        variation,
+        shot_type
+    )
 
 
 # ----------------------------
@@ -84,6 +93,104 @@ def calculate_effective_score(
 
 
 
+# ----------------------------
+# Compiled Outcome Table
+# ----------------------------
+# Every outcome rule lives here. Indexed by effective score (1-100), the
+# shot's max-runs class and whether the delivery is on the stumps at a
+# wicket taking length.
+OUTCOMES = (0, 2, 4, 6, "W")
+OUTCOME_TYPES = {0: "DOT", 2: "TWO", 4: "FOUR", 6: "SIX", "W": "WICKET"}
+MAX_RUNS_CLASSES = (0, 4, 6)
+
+
+def max_runs_class(max_runs):
+    """0 for defensive shots, 2 for shots that can go for six, else 1"""
+    if max_runs == 0:
+        return 0
+    return 2 if max_runs == 6 else 1
+
+
+def is_wicket_delivery(line, length):
+    return line in STUMP_LINES and length in WICKET_LENGTHS
+
+
+def build_outcome_table():
+    """Outcome distribution over OUTCOMES for every table cell"""
+    table = np.zeros((101, len(MAX_RUNS_CLASSES), 2, len(OUTCOMES)))
+
+    for effective_score in range(1, 101):
+        for cls, max_runs in enumerate(MAX_RUNS_CLASSES):
+            for at_stumps in (0, 1):
+                # Defense & Leave always dot
+                if max_runs == 0:
+                    runs = 0
+                # Very High
+                elif effective_score >= 98:
+                    runs = 6 if max_runs == 6 else 4
+                # High
+                elif effective_score >= 85:
+                    runs = 4
+                # Medium
+                elif effective_score >= 75:
+                    runs = 2
+                # Low Case
+                else:
+                    runs = 0
+
+                # Low scoring shots at the stumps are out when a
+                # randint(1, 100) roll beats the effective score
+                wicket = 0.0
+                if max_runs != 0 and effective_score < 75 and at_stumps:
+                    wicket = (100 - effective_score) / 100
+
+                cell = table[effective_score, cls, at_stumps]
+                cell[OUTCOMES.index(runs)] = 1 - wicket
+                cell[OUTCOMES.index("W")] = wicket
+
+    return table
+
+
+OUTCOME_TABLE = build_outcome_table()
+
+# Runs a shot scores when it is not out, and whether it can be out at all
+OUTCOME_RUNS = np.array(OUTCOMES[:4])[OUTCOME_TABLE[..., :4].argmax(axis=-1)]
+OUTCOME_WICKET_RISK = OUTCOME_TABLE[..., 4] > 0
+
+# Exact expected runs per cell, a wicket scores nothing
+OUTCOME_EXPECTED_RUNS = OUTCOME_TABLE[..., :4] @ np.array(OUTCOMES[:4])
+
+# Plain nested lists for the one-ball path, faster than numpy scalars
+_OUTCOME_LOOKUP = [
+    [[(int(OUTCOME_RUNS[e, c, f]), bool(OUTCOME_WICKET_RISK[e, c, f]))
+      for f in (0, 1)]
+     for c in range(len(MAX_RUNS_CLASSES))]
+    for e in range(101)
+]
+
+
+def resolve_outcome(effective_score, max_runs, at_stumps, rng=random):
+    """Runs scored or "W", rolling for a wicket only where the table says"""
+    runs, wicket_risk = _OUTCOME_LOOKUP[effective_score][max_runs_class(max_runs)][int(at_stumps)]
+
+    if wicket_risk:
+        wicket_roll = rng.randint(1, 100)
+        if wicket_roll > effective_score:
+            return "W"
+
+    return runs
+
+
+def outcome_distribution(effective_score, line, length, shot_type):
+    """Exact probabilities of every outcome, keyed like the results"""
+    cell = OUTCOME_TABLE[
+        effective_score,
+        max_runs_class(SHOT_MAX_RUNS.get(shot_type, 4)),
+        int(is_wicket_delivery(line, length))
+    ]
+    return {str(outcome): float(p) for outcome, p in zip(OUTCOMES, cell)}
+
+
 # ----------------------------
 # Simulate Ball Outcome
 # ----------------------------
@@ -110,63 +217,234 @@ def simulate_ball(
         shot_rating
     )
 
-    max_runs = SHOT_MAX_RUNS.get(shot_type, 4)
+    result = get_outcome_from_effective_score(
+        effective_score,
+        line,
+        length,
+        shot_type
+    )
+
+    return {
+        "Result": result,
+        "Type": OUTCOME_TYPES[result],
+        "Effective Score": effective_score
+    }
 
-    # Defense & Leave always dot
-    if max_runs == 0:
-        return {
-            "Result": 0,
-            "Type": "DOT",
-            "Effective Score": effective_score
-        }
 
-    # Very High
-    if effective_score >= 98:
-        if max_runs == 6:
-            return {"Result": 6, "Type": "SIX", "Effective Score": effective_score}
-        else:
-            return {"Result": 4, "Type": "FOUR", "Effective Score": effective_score}
+# ----------------------------
+# Outcome from an Effective Score
+# ----------------------------
+def get_outcome_from_effective_score(
+        effective_score,
+        line,
+        length,
+        shot_type,
+        rng=random):
+    """Use simulate_ball logic for consistent results"""
+    return resolve_outcome(
+        effective_score,
+        SHOT_MAX_RUNS.get(shot_type, 4),
+        is_wicket_delivery(line, length),
+        rng
+    )
+
 
-    # High
-    if 85 <= effective_score < 98:
-        return {"Result": 4, "Type": "FOUR", "Effective Score": effective_score}
+# ----------------------------
+# Score Every Shot at Once
+# ----------------------------
+_max_runs_classes = {}
 
-    # Medium
-    if 75 <= effective_score < 85:
-        return {"Result": 2, "Type": "TWO", "Effective Score": effective_score}
 
-    # Low Case
-    stump_lines = ["Off Stump", "Middle Stump", "Leg Stump"]
+def get_max_runs_classes(shots):
+    """max_runs_class of every shot, aligned with a sheet's shot columns"""
+    key = tuple(shots)
+    if key not in _max_runs_classes:
+        _max_runs_classes[key] = np.array(
+            [max_runs_class(SHOT_MAX_RUNS.get(shot, 4)) for shot in shots])
+    return _max_runs_classes[key]
 
-    if line in stump_lines and length in ["Yorker", "Good Length", "Full"]:
-        wicket_roll = random.randint(1, 100)
-        if wicket_roll > effective_score:
-            return {"Result": "W", "Type": "WICKET", "Effective Score": effective_score}
 
-    return {"Result": 0, "Type": "DOT", "Effective Score": effective_score}
+def score_all_shots(
+        batsman_rating,
+        bowler_rating,
+        bowling_type,
+        line,
+        length,
+        variation,
+        ratings=None):
+    """Effective score and outcome bucket of every shot for one delivery.
+
+    "runs" holds the runs each shot is guaranteed by the 75/85/98
+    thresholds, and "wicket_risk" marks the low scoring shots that
+    simulate_ball would roll for a wicket.
+    """
+    shots, shot_ratings = (ratings or RATINGS).shot_vector(
+        bowling_type,
+        line,
+        length,
+        variation
+    )
 
+    score = (
+        0.8 * shot_ratings +
+        0.4 * batsman_rating -
+        0.2 * bowler_rating
+    )
+    effective = np.clip(score.astype(int), 1, 100)
+
+    classes = get_max_runs_classes(shots)
+    at_stumps = int(is_wicket_delivery(line, length))
+
+    return {
+        "shots": shots,
+        "effective": effective,
+        "runs": OUTCOME_RUNS[effective, classes, at_stumps],
+        "wicket_risk": OUTCOME_WICKET_RISK[effective, classes, at_stumps],
+        "distribution": OUTCOME_TABLE[effective, classes, at_stumps],
+        "expected_runs": OUTCOME_EXPECTED_RUNS[effective, classes, at_stumps]
+    }
+
+
+def cache_per_store(maxsize):
+    """LRU cache of a function whose last argument is a rating store.
+
+    Each store gets its own cache, held weakly, so reloaded stores are
+    freed with their cached arrays instead of staying alive as cache keys.
+    """
+    def decorate(function):
+        caches = weakref.WeakKeyDictionary()
+        lock = threading.Lock()
+        arity = function.__code__.co_argcount
+
+        @wraps(function)
+        def cached(*args, ratings=None):
+            if len(args) == arity:
+                *args, ratings = args
+            ratings = ratings or RATINGS
+            key = tuple(args)
+            with lock:
+                cache = caches.setdefault(ratings, OrderedDict())
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+
+            result = function(*key, ratings=ratings)
+            with lock:
+                cache[key] = result
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return result
+
+        cached.cache_clear = caches.clear
+        return cached
+    return decorate
+
+
+@cache_per_store(maxsize=64)
+def score_sheet(batsman_rating, bowler_rating, bowling_type, ratings=None):
+    """score_all_shots for every delivery of one sheet at once.
+
+    Arrays are shaped (line, length, variation, shot) in the sheet's
+    dropdown order. Deliveries the sheet does not have score 0, with no
+    runs and no wicket chance. Arrays are read-only as they are shared
+    between callers.
+    """
+    ratings = ratings or RATINGS
+    vocab = ratings.sheets[bowling_type]
+    lines, lengths, variations, shots = (
+        vocab["lines"], vocab["lengths"], vocab["variations"], vocab["shots"])
+
+    shot_ratings = np.zeros((len(lines), len(lengths), len(variations), len(shots)),
+                            dtype=np.uint8)
+    for i, line in enumerate(lines):
+        for j, length in enumerate(lengths):
+            for k, variation in enumerate(variations):
+                try:
+                    _, shot_ratings[i, j, k] = ratings.shot_vector(
+                        bowling_type, line, length, variation)
+                except ValueError:
+                    pass
 
-def get_dropdown_data():
-    data = {}
-    for sheet in wb.sheetnames:
-        ws = wb[sheet]
-        headers = [cell.value for cell in ws[1]]
-        shots = headers[3:]
+    score = (
+        0.8 * shot_ratings +
+        0.4 * batsman_rating -
+        0.2 * bowler_rating
+    )
+    effective = np.clip(score.astype(int), 1, 100)
+
+    classes = get_max_runs_classes(shots)
+    at_stumps = np.array([[int(is_wicket_delivery(line, length)) for length in lengths]
+                          for line in lines])
+    index = (effective, classes, at_stumps[:, :, None, None])
+    valid = shot_ratings.all(axis=-1, keepdims=True)
+
+    result = {
+        "lines": lines,
+        "lengths": lengths,
+        "variations": variations,
+        "shots": shots,
+        "effective": effective * valid,
+        "runs": OUTCOME_RUNS[index] * valid,
+        "wicket": OUTCOME_TABLE[index][..., OUTCOMES.index("W")] * valid,
+        "expected_runs": OUTCOME_EXPECTED_RUNS[index] * valid
+    }
+    for key in ("effective", "runs", "wicket", "expected_runs"):
+        result[key].flags.writeable = False
+
+    return result
+
+
+# ----------------------------
+# Exact Outcomes for the Whole Cube
+# ----------------------------
+@cache_per_store(maxsize=32)
+def get_outcome_cube(batsman_rating, bowler_rating, ratings=None):
+    """Exact outcome distribution of every rating cell for one matchup.
+
+    Returns (distribution, expected_runs, valid): distribution has the
+    rating cube's shape plus a trailing OUTCOMES axis, and cells missing
+    from a sheet are all zero with valid False. Arrays are read-only as
+    they are shared between callers.
+    """
+    ratings = ratings or RATINGS
+    cube = ratings.cube
+    score = (
+        0.8 * cube +
+        0.4 * batsman_rating -
+        0.2 * bowler_rating
+    )
+    effective = np.clip(score.astype(int), 1, 100)
+
+    classes = np.array([max_runs_class(SHOT_MAX_RUNS.get(shot, 4))
+                        for shot in ratings.shots])
+    at_stumps = np.array([[int(is_wicket_delivery(line, length))
+                           for length in ratings.lengths]
+                          for line in ratings.lines])
 
-        lines = set()
-        lengths = set()
-        variations = set()
+    index = (effective,
+             classes[None, None, None, None, :],
+             at_stumps[None, :, :, None, None])
+    valid = cube > 0
+    distribution = OUTCOME_TABLE[index] * valid[..., None]
+    expected_runs = OUTCOME_EXPECTED_RUNS[index] * valid
 
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            lines.add(row[0])
-            lengths.add(row[1])
-            variations.add(row[2])
+    for array in (distribution, expected_runs, valid):
+        array.flags.writeable = False
+
+    return distribution, expected_runs, valid
+
+
+def get_dropdown_data(ratings=None):
+    ratings = ratings or RATINGS
+    data = {}
+    for sheet in ratings.bowling_types:
+        vocab = ratings.sheets[sheet]
 
         data[sheet] = {
-            "shots": shots,
-            "lines": list(lines),
-            "lengths": list(lengths),
-            "variations": list(variations)
+            "shots": list(vocab["shots"]),
+            "lines": list(vocab["lines"]),
+            "lengths": list(vocab["lengths"]),
+            "variations": list(vocab["variations"])
         }
     return data
 
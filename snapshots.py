@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+import numpy as np
+
+from bowling_strategy import STRATEGY_PATH, load_strategy
+from combinations import COMBINATIONS, CombinationIndex
+from match_store import DEFAULT_TTL
+from metrics import count
+from ratings import (
+    RatingStore,
+    binary_path_for,
+    compile_ratings,
+    is_binary_fresh,
+    load_compiled,
+    source_stamp
+)
+from shot import FILE_PATH, RATINGS, get_dropdown_data
+
+# Seconds between checks of the workbook, 0 turns the watcher off
+RELOAD_INTERVAL = float(os.environ.get("RATINGS_RELOAD_INTERVAL", "2"))
+
+# Snapshots kept after they stop being current. Versions a match used
+# within the match TTL are kept on top of these.
+KEEP_SNAPSHOTS = 8
+
+
+class SnapshotExpired(LookupError):
+    """The ratings version a match started on is no longer loaded"""
+
+
+# ----------------------------
+# Rating Snapshot
+# ----------------------------
+def rating_version(ratings):
+    """Content hash of a rating store, the same in every worker"""
+    if getattr(ratings, "digest", None):
+        # Block files hash their footer, it covers every block's checksum
+        return ratings.digest
+
+    digest = hashlib.blake2b(digest_size=6)
+    digest.update(json.dumps([ratings.bowling_types, ratings.lines, ratings.lengths,
+                              ratings.variations, ratings.shots, ratings.sheets]).encode())
+    digest.update(np.ascontiguousarray(ratings.cube).tobytes())
+    return digest.hexdigest()
+
+
+class RatingSnapshot:
+    """One version of the ratings and everything built from them.
+
+    Dropdown data, the combination index and the solved bowling strategy
+    all follow the ratings, so they are built together and never mixed
+    across versions. The strategy is None when it was never solved, a
+    reload keeps the previous one until bowling_strategy.py is re-run.
+    """
+
+    def __init__(self, ratings, source=None, combinations=None, strategy=None):
+        self.ratings = ratings
+        self.source = source
+        self.version = rating_version(ratings)
+        self.dropdown_data = get_dropdown_data(ratings)
+        self.dropdown_json = json.dumps(self.dropdown_data, separators=(",", ":"))
+        self.dropdown_version = hashlib.sha1(self.dropdown_json.encode()).hexdigest()[:12]
+        self.combinations = combinations or CombinationIndex(self.dropdown_data, ratings)
+        self.strategy = strategy
+        self._sheet_payloads = {}
+
+    def sheet_payload(self, bowling_type):
+        """(json, etag) of one sheet's dropdown data, built on first request"""
+        payload = self._sheet_payloads.get(bowling_type)
+        if payload is None:
+            body = json.dumps(self.dropdown_data[bowling_type], separators=(",", ":"))
+            payload = (body, hashlib.sha1(body.encode()).hexdigest()[:12])
+            self._sheet_payloads[bowling_type] = payload
+        return payload
+
+    def has_delivery(self, delivery):
+        """True if these ratings can bowl the (type, line, length, variation)"""
+        try:
+            self.ratings.shot_vector(*delivery)
+        except ValueError:
+            return False
+        return True
+
+
+def load_snapshot(path=FILE_PATH, previous=None):
+    """Snapshot of the workbook as it is now.
+
+    Compiles the .ratings file when it is stale so the other workers can
+    map it, and parses the xlsx directly if it cannot be written. A
+    strategy table solved for older ratings is not loaded, the previous
+    snapshot's strategy is kept instead and reported as stale.
+    """
+    source = source_stamp(path)
+    binary_path = binary_path_for(path)
+    if is_binary_fresh(path, binary_path):
+        ratings = load_compiled(binary_path)
+    else:
+        try:
+            ratings = load_compiled(compile_ratings(path, binary_path))
+        except OSError:
+            ratings = RatingStore.from_xlsx(path)
+
+    strategy = load_strategy()
+    if strategy is None and previous is not None and previous.strategy is not None:
+        count("strategy_reloads", result="stale")
+        print(f"{STRATEGY_PATH} was solved for older ratings, the bot keeps "
+              f"bowling it until bowling_strategy.py is re-run", file=sys.stderr)
+        strategy = previous.strategy
+    return RatingSnapshot(ratings, source, strategy=strategy)
+
+
+# ----------------------------
+# Snapshot Registry
+# ----------------------------
+class RatingSnapshots:
+    """The current rating snapshot and the recent ones matches still use.
+
+    A daemon thread stats the workbook every `interval` seconds. When it
+    changes, a new snapshot is built off the request path and made
+    current with one assignment; requests that already hold a snapshot
+    are unaffected. A workbook that fails to load, e.g. half saved, keeps
+    the current ratings until it changes again.
+    """
+
+    def __init__(self, initial, path=FILE_PATH, interval=RELOAD_INTERVAL,
+                 keep=KEEP_SNAPSHOTS, ttl=DEFAULT_TTL):
+        self.path = path
+        self.keep = keep
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.versions = OrderedDict()
+        self.last_used = {}
+        self.stamp = initial.source
+        self.current = initial
+        self.publish(initial)
+
+        if interval > 0:
+            thread = threading.Thread(target=self._watch, args=(interval,),
+                                      daemon=True, name="rating-watcher")
+            thread.start()
+
+    @classmethod
+    def from_config(cls):
+        """Registry starting from the ratings this process imported"""
+        source = source_stamp(FILE_PATH) if os.path.exists(FILE_PATH) else None
+        return cls(RatingSnapshot(RATINGS, source, COMBINATIONS, load_strategy()),
+                   ttl=int(os.environ.get("MATCH_TTL", DEFAULT_TTL)))
+
+    def publish(self, snapshot):
+        with self.lock:
+            # Same content as a kept version, keep its warm caches
+            snapshot = self.versions.pop(snapshot.version, snapshot)
+            self.versions[snapshot.version] = snapshot
+            self.current = snapshot
+
+            # Oldest first, skipping versions a live match may still be on
+            in_use = time.monotonic() - self.ttl
+            spare = len(self.versions) - self.keep
+            for version in list(self.versions):
+                if spare <= 0 or version == snapshot.version:
+                    break
+                if self.last_used.get(version, 0) < in_use:
+                    del self.versions[version]
+                    self.last_used.pop(version, None)
+                    spare -= 1
+        return snapshot
+
+    def get(self, version):
+        """Snapshot a match started on, the current one before a match starts.
+
+        Raises SnapshotExpired when the version is not loaded here, so a
+        match never carries on with different ratings.
+        """
+        if version is None:
+            return self.current
+
+        snapshot = self.versions.get(version)
+        if snapshot is None and self.check():
+            # Another worker may have loaded a newer workbook first
+            snapshot = self.versions.get(version)
+        if snapshot is None:
+            raise SnapshotExpired(version)
+
+        with self.lock:
+            self.last_used[version] = time.monotonic()
+        return snapshot
+
+    def find_dropdown(self, dropdown_version):
+        """Kept snapshot whose dropdown data has this version, or None"""
+        for snapshot in list(self.versions.values()):
+            if snapshot.dropdown_version == dropdown_version:
+                return snapshot
+        return None
+
+    def check(self):
+        """Load the workbook if it changed since the last check, True if it did"""
+        try:
+            stamp = source_stamp(self.path)
+        except OSError:
+            return False
+        if stamp == self.stamp:
+            return False
+
+        self.stamp = stamp
+        try:
+            snapshot = load_snapshot(self.path, self.current)
+        except Exception:
+            count("rating_reloads", result="failed")
+            traceback.print_exc()
+            return False
+
+        count("rating_reloads", result="ok")
+        self.publish(snapshot)
+        return True
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            self.check()
@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from urllib.parse import parse_qs, urlsplit
+
+from commentary import generate_commentary
+from match_engine import MatchEngine
+from teams import TEAMS
+
+# Finished matches stay watchable (and resumable) this long
+RETENTION = 30 * 60
+
+# Matches nobody has published to for this long are dropped unfinished
+IDLE_TIMEOUT = 30 * 60
+
+# Limits for bot matches started over POST /matches, which needs no token
+MAX_BOT_MATCHES = 4
+MAX_BOT_OVERS = 20
+BOT_INTERVAL_RANGE = (0.1, 10.0)
+BOT_MODES = ("easy", "medium", "hard")
+
+# Comment lines sent to idle streams so proxies keep them open
+KEEPALIVE_INTERVAL = 15
+
+SPECTATE_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "templates", "spectate.html")
+
+
+def get_overs_display(balls):
+    return f"{balls // 6}.{balls % 6}"
+
+
+# ----------------------------
+# Match Channel
+# ----------------------------
+class MatchChannel:
+    """Event history of one match, fanned out to every viewer.
+
+    The producer encodes each event once and appends it. Viewers only
+    hold an index into the history and wait on a shared condition, so an
+    idle viewer costs one suspended coroutine and no queue of its own.
+    """
+
+    def __init__(self, match_id, title):
+        self.match_id = match_id
+        self.title = title
+        self.history = []
+        self.finished_at = None
+        self.last_publish = time.monotonic()
+        self.condition = asyncio.Condition()
+
+    async def publish(self, event, data):
+        payload = json.dumps(data, separators=(",", ":"))
+        message = f"id: {len(self.history) + 1}\nevent: {event}\ndata: {payload}\n\n"
+        async with self.condition:
+            self.history.append(message.encode())
+            self.last_publish = time.monotonic()
+            if event == "end":
+                self.finished_at = time.monotonic()
+            self.condition.notify_all()
+
+    async def stream(self, writer, last_event_id=0):
+        """Replay missed events, then follow the match until it ends"""
+        sent = min(max(0, last_event_id), len(self.history))
+        while True:
+            async with self.condition:
+                if sent == len(self.history):
+                    if self.finished_at is not None:
+                        return
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), KEEPALIVE_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = self.history[sent:]
+
+            writer.write(b"".join(pending) if pending else b": keepalive\n\n")
+            sent += len(pending)
+            await writer.drain()
+
+    def describe(self):
+        return {
+            "id": self.match_id,
+            "title": self.title,
+            "events": len(self.history),
+            "live": self.finished_at is None
+        }
+
+
+# ----------------------------
+# Bot vs Bot Producer
+# ----------------------------
+def bot_match_events(overs, mode, batting_first, bowling_first, seed):
+    """Play a whole bot match and return its events in order"""
+    events = []
+
+    def on_ball(ball):
+        comment = generate_commentary(ball["batsman"]["name"], ball["bowler"]["name"],
+                                      ball["result"])
+        events.append(("ball", {
+            "innings": ball["innings"],
+            "ball": ball["ball"],
+            "overs": get_overs_display(ball["ball"]),
+            "runs": ball["runs"],
+            "wickets": ball["wickets"],
+            "batsman": ball["batsman"]["name"],
+            "bowler": ball["bowler"]["name"],
+            "result": ball["result"],
+            "comment": f"{comment} | {ball['bowling_type']} ({ball['line']}, "
+                       f"{ball['length']}, {ball['variation']}), {ball['shot']}"
+        }))
+
+    engine = MatchEngine(overs, mode, batting_first, bowling_first,
+                         random.Random(seed), on_ball=on_ball)
+    result = engine.play_match()
+
+    # Innings breaks go in front of the second innings' first ball
+    split = next(i for i, (_, ball) in enumerate(events) if ball["innings"] == 2)
+    events.insert(split, ("innings", {"innings": 2, "target": result["target"]}))
+    events.append(("end", {
+        "winner": result["winner"],
+        "tie": result["tie"],
+        "target": result["target"],
+        "first_innings": result["first_innings"]["runs"],
+        "second_innings": result["second_innings"]["runs"]
+    }))
+    return events
+
+
+# ----------------------------
+# Spectator Server
+# ----------------------------
+class SpectatorServer:
+    """Plain asyncio HTTP server: match list, SSE streams and publishing.
+
+    GET  /                        spectator page
+    GET  /matches                 live and recently finished matches
+    POST /matches                 start a paced bot vs bot match
+    GET  /matches/<id>/events     server-sent events, honours Last-Event-ID
+    POST /matches/<id>/events     publish {"event", "data"} (the Flask app)
+
+    Publishing needs `token` as X-Spectator-Token, so only the app can
+    write to a match channel.
+    """
+
+    def __init__(self, token):
+        if not token:
+            raise ValueError("A spectator server needs a publisher token")
+        self.channels = {}
+        self.token = token
+        self.tasks = set()
+
+    def channel(self, match_id, title=None):
+        if match_id not in self.channels:
+            self.channels[match_id] = MatchChannel(match_id, title or match_id)
+        return self.channels[match_id]
+
+    def drop_stale(self):
+        """Drop matches finished for RETENTION or idle for IDLE_TIMEOUT"""
+        now = time.monotonic()
+        for match_id, channel in list(self.channels.items()):
+            if channel.finished_at is not None:
+                if now - channel.finished_at > RETENTION:
+                    del self.channels[match_id]
+            elif now - channel.last_publish > IDLE_TIMEOUT:
+                # Viewers see it as ended on their next keepalive
+                channel.finished_at = now
+                del self.channels[match_id]
+
+    def start_bot_match(self, overs=20, mode="medium", batting_first="CSK",
+                        bowling_first="MI", interval=1.0, seed=None):
+        match_id = secrets.token_urlsafe(8)
+        channel = self.channel(match_id, f"{batting_first} vs {bowling_first} (bots)")
+        task = asyncio.get_running_loop().create_task(self._produce(
+            channel, overs, mode, batting_first, bowling_first, interval, seed))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return match_id
+
+    async def _produce(self, channel, overs, mode, batting_first, bowling_first,
+                       interval, seed):
+        loop = asyncio.get_running_loop()
+        events = await loop.run_in_executor(None, bot_match_events, overs, mode,
+                                            batting_first, bowling_first, seed)
+        for event, data in events:
+            await channel.publish(event, data)
+            await asyncio.sleep(interval)
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            body = await reader.readexactly(length) if length else b""
+            await self.route(method, target, headers, body, writer)
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, headers, body, writer):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        self.drop_stale()
+
+        if method == "GET" and not parts:
+            with open(SPECTATE_PAGE, "rb") as f:
+                return await respond(writer, 200, f.read(), "text/html; charset=utf-8")
+
+        if parts == ["matches"]:
+            if method == "GET":
+                return await respond_json(writer, 200, [
+                    channel.describe() for channel in self.channels.values()])
+            if method == "POST":
+                options = parse_qs(url.query)
+                try:
+                    overs = int(options.get("overs", ["20"])[0])
+                    interval = float(options.get("interval", ["1"])[0])
+                    seed = options.get("seed", [None])[0]
+                    seed = int(seed) if seed is not None else None
+                except ValueError:
+                    return await respond_json(writer, 400, {"error": "bad options"})
+                if not 1 <= overs <= MAX_BOT_OVERS:
+                    return await respond_json(writer, 400, {
+                        "error": f"overs must be 1 to {MAX_BOT_OVERS}"})
+                if not BOT_INTERVAL_RANGE[0] <= interval <= BOT_INTERVAL_RANGE[1]:
+                    return await respond_json(writer, 400, {
+                        "error": "interval must be %g to %g seconds" % BOT_INTERVAL_RANGE})
+                mode = options.get("mode", ["medium"])[0]
+                if mode not in BOT_MODES:
+                    return await respond_json(writer, 400, {"error": "unknown mode"})
+                batting_first = options.get("batting_first", ["CSK"])[0]
+                bowling_first = options.get("bowling_first", ["MI"])[0]
+                if batting_first not in TEAMS or bowling_first not in TEAMS:
+                    return await respond_json(writer, 400, {"error": "unknown team"})
+                if len(self.tasks) >= MAX_BOT_MATCHES:
+                    return await respond_json(writer, 429, {"error": "too many bot matches"})
+
+                match_id = self.start_bot_match(overs, mode, batting_first,
+                                                bowling_first, interval, seed)
+                return await respond_json(writer, 201, {"id": match_id})
+
+        if len(parts) == 3 and parts[0] == "matches" and parts[2] == "events":
+            match_id = parts[1]
+
+            if method == "POST":
+                if not secrets.compare_digest(headers.get("x-spectator-token", ""), self.token):
+                    return await respond_json(writer, 403, {"error": "bad token"})
+                try:
+                    message = json.loads(body)
+                    event, data = message["event"], message["data"]
+                except (ValueError, KeyError, TypeError):
+                    return await respond_json(writer, 400, {"error": "bad event"})
+                channel = self.channel(match_id, message.get("title"))
+                await channel.publish(event, data)
+                return await respond_json(writer, 202, {"events": len(channel.history)})
+
+            if method == "GET":
+                channel = self.channels.get(match_id)
+                if channel is None:
+                    return await respond_json(writer, 404, {"error": "unknown match"})
+                try:
+                    last_event_id = int(headers.get("last-event-id", 0))
+                except ValueError:
+                    last_event_id = 0
+
+                writer.write(b"HTTP/1.1 200 OK\r\n"
+                             b"Content-Type: text/event-stream\r\n"
+                             b"Cache-Control: no-cache\r\n"
+                             b"Connection: close\r\n\r\n"
+                             b"retry: 3000\n\n")
+                return await channel.stream(writer, last_event_id)
+
+        return await respond_json(writer, 404, {"error": "not found"})
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def respond(writer, status, body, content_type):
+    reason = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request",
+              403: "Forbidden", 404: "Not Found", 429: "Too Many Requests"}[status]
+    writer.write(f"HTTP/1.1 {status} {reason}\r\n"
+                 f"Content-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+
+
+async def respond_json(writer, status, data):
+    await respond(writer, status, json.dumps(data).encode(), "application/json")
+
+
+# ----------------------------
+# Publisher (Flask side)
+# ----------------------------
+class SpectatorPublisher:
+    """Forwards events from the web app to a spectator server.
+
+    Events go through a bounded queue to one background thread, so a slow
+    or missing spectator server drops events instead of slowing a match.
+    """
+
+    def __init__(self, base_url, token, maxsize=1000, timeout=2):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls):
+        """Publisher for SPECTATOR_URL, None when spectating is off"""
+        url = os.environ.get("SPECTATOR_URL")
+        if not url:
+            return None
+        token = os.environ.get("SPECTATOR_TOKEN")
+        if not token:
+            raise ValueError("SPECTATOR_URL needs SPECTATOR_TOKEN, the spectator server's token")
+        return cls(url, token)
+
+    def publish(self, match_id, event, data, title=None):
+        try:
+            self.queue.put_nowait((match_id, {"event": event, "data": data, "title": title}))
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            match_id, message = self.queue.get()
+            headers = {"Content-Type": "application/json",
+                       "X-Spectator-Token": self.token}
+            request = urllib.request.Request(
+                f"{self.base_url}/matches/{match_id}/events",
+                data=json.dumps(message).encode(),
+                headers=headers
+            )
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError:
+                pass
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Serve live matches to spectators over server-sent events")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", default=os.environ.get("SPECTATOR_TOKEN"),
+                        help="required from publishers as X-Spectator-Token")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("set --token or SPECTATOR_TOKEN, publishing is refused without one")
+
+    print(f"Spectator server on http://{args.host}:{args.port}/")
+    asyncio.run(SpectatorServer(args.token).serve(args.host, args.port))
@@ -1,16 +1,29 @@
 // Global variable to store bot's bowling choice
 let storedBotChoice = null;
 let storedScores = null;  // Cache scores so we don't refetch unnecessarily
+let dropdownDataPromise = null;  // Dropdown data for every sheet, fetched once
+let bowlingScores = {};  // Batched bowling scores per type, for the rest of the over
+let nextBall = null;  // Balls bowled this innings, known after the first ball
+
+function loadDropdownData() {
+    if (!dropdownDataPromise) {
+        const form = document.getElementById('playBallForm');
+        const url = form?.dataset.dropdownUrl || '/dropdown_data.json';
+        dropdownDataPromise = fetch(url).then(response => response.json());
+    }
+    return dropdownDataPromise;
+}
 
 function updateDropdowns() {
     const bowlingType = document.getElementById("bowling_type")?.value || 
                         document.getElementById("bowlingTypeSelect")?.value;
 
-    if (!bowlingType) return;
+    if (!bowlingType) return Promise.resolve();
 
-    fetch(`/get_sheet_data/${bowlingType}`)
-        .then(response => response.json())
-        .then(data => {
+    return loadDropdownData()
+        .then(allData => {
+            const data = allData[bowlingType];
+            if (!data) return;
             populateDropdown("line", data.lines);
             populateDropdown("length", data.lengths);
             populateDropdown("variation", data.variations);
@@ -61,12 +74,13 @@ document.addEventListener('DOMContentLoaded', function() {
     const bowlingTypeSelect = document.getElementById('bowlingTypeSelect');
     if (bowlingTypeSelect) {
         bowlingTypeSelect.addEventListener('change', function() {
-            updateDropdowns();
-            const checkBox = document.getElementById('showScoreCheckbox');
-            if (checkBox && checkBox.checked) {
-                // For bowling, fetch new scores based on new selections
-                fetchAndDisplayBowlingScores();
-            }
+            updateDropdowns().then(() => {
+                const checkBox = document.getElementById('showScoreCheckbox');
+                if (checkBox && checkBox.checked) {
+                    // For bowling, look up scores for the new selections
+                    fetchAndDisplayBowlingScores();
+                }
+            });
         });
     }
 
@@ -115,9 +129,92 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Play balls through the JSON endpoint and update the page in place
+    const playBallForm = document.getElementById('playBallForm');
+    if (playBallForm) {
+        playBallForm.addEventListener('submit', function(event) {
+            event.preventDefault();
+            playBall(playBallForm);
+        });
+    }
+
     updateDropdowns();
 });
 
+function playBall(form) {
+    const button = form.querySelector('button[type="submit"]');
+    if (button) button.disabled = true;
+
+    fetch('/api/ball', {
+        method: 'POST',
+        body: new FormData(form)
+    })
+    .then(response => response.json())
+    .then(delta => {
+        if (delta.error) {
+            // The match was ended by the server, e.g. its ratings expired
+            alert(delta.error);
+            window.location.href = '/';
+            return;
+        }
+        if (delta.innings_over) {
+            // Innings change and result pages are still full page renders
+            form.submit();
+            return;
+        }
+        applyBallDelta(delta);
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        form.submit();
+    })
+    .finally(() => {
+        if (button) button.disabled = false;
+    });
+}
+
+function applyBallDelta(delta) {
+    // A wicket brings in a new batsman, batched bowling scores are stale
+    const wicketsBefore = parseInt(document.getElementById('scoreWickets').textContent, 10);
+    if (delta.wickets !== wicketsBefore) {
+        bowlingScores = {};
+    }
+    nextBall = delta.ball;
+
+    document.getElementById('scoreRuns').textContent = delta.runs;
+    document.getElementById('scoreWickets').textContent = delta.wickets;
+    document.getElementById('oversDisplay').textContent = delta.overs_display;
+    document.getElementById('currentBatsman').textContent = delta.current_batsman;
+    document.getElementById('currentBowler').textContent = delta.current_bowler;
+
+    // Newest ball on top, keep the same number of balls the server renders
+    const list = document.getElementById('commentaryList');
+    document.getElementById('commentaryPlaceholder')?.remove();
+    const item = document.createElement('div');
+    item.className = 'commentary-item';
+    item.textContent = delta.comment;
+    list.prepend(item);
+    const capacity = parseInt(list.dataset.capacity, 10) || 12;
+    while (list.children.length > capacity) {
+        list.lastElementChild.remove();
+    }
+
+    // Next ball: new bot choice and scores, exactly as after a page load
+    storedBotChoice = null;
+    storedScores = null;
+    const checkBox = document.getElementById('showScoreCheckbox');
+    if (document.getElementById('shotSelect') !== null) {
+        document.getElementById('effectiveScoresDiv').style.display = 'none';
+        showBotChoice().then(() => {
+            if (checkBox && checkBox.checked) {
+                fetchAndCacheScores();
+            }
+        });
+    } else if (checkBox && checkBox.checked) {
+        fetchAndDisplayBowlingScores();
+    }
+}
+
 // ✅ NEW: Reset cached data before page navigates away (for new ball)
 window.addEventListener('beforeunload', function() {
     storedBotChoice = null;
@@ -126,7 +223,7 @@ window.addEventListener('beforeunload', function() {
 
 // Fetch bot's bowling choice ONCE on page load
 function showBotChoice() {
-    fetch('/get_effective_scores', {
+    return fetch('/get_effective_scores', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -190,26 +287,63 @@ function fetchAndDisplayBowlingScores() {
     const length = document.getElementById('lengthSelect').value;
     const variation = document.getElementById('variationSelect').value;
     
-    fetch('/get_effective_scores', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            'action': 'bowling',
-            'bowling_type': bowlingType,
-            'line': line,
-            'length': length,
-            'variation': variation
-        })
-    })
-    .then(response => response.json())
+    // Looked up locally, the server is asked once per type per over
+    loadBowlingScores(bowlingType)
     .then(data => {
-        displayBowlingScores(data.bot_choice, data.all_scores);
+        const scores = bowlingScoresFor(data, line, length, variation);
+        if (scores) {
+            displayBowlingScores(scores.botChoice, scores.allScores);
+        }
     })
     .catch(error => console.error('Error:', error));
 }
 
+function loadBowlingScores(bowlingType) {
+    const cached = bowlingScores[bowlingType];
+    if (cached && (nextBall === null || cached.balls.includes(nextBall))) {
+        return Promise.resolve(cached);
+    }
+    return fetch(`/effective_scores/${encodeURIComponent(bowlingType)}`)
+        .then(response => response.json())
+        .then(data => {
+            bowlingScores[bowlingType] = data;
+            return data;
+        });
+}
+
+// Same shape as the /get_effective_scores bowling response, from the batch
+function bowlingScoresFor(data, line, length, variation) {
+    const l = data.lines.indexOf(line);
+    const le = data.lengths.indexOf(length);
+    const v = data.variations.indexOf(variation);
+    if (l < 0 || le < 0 || v < 0) return null;
+
+    // Columns are flat in (line, length, variation, shot) order
+    const delivery = (l * data.lengths.length + le) * data.variations.length + v;
+    const base = delivery * data.shots.length;
+    const allScores = data.shots.map((name, s) => {
+        const wicket = data.wicket[base + s];
+        return {
+            name: name,
+            score: data.score[base + s],
+            expected_runs: data.runs[base + s] * (1 - wicket),
+            distribution: {W: wicket},
+            type: 'bowling'
+        };
+    }).sort((a, b) => b.score - a.score);
+
+    const ball = nextBall === null ? 0 : Math.max(0, data.balls.indexOf(nextBall));
+    const pick = data.bot_shots[ball] ? data.bot_shots[ball][delivery] : -1;
+    return {
+        botChoice: {
+            type: 'shot',
+            shot: pick >= 0 ? data.shots[pick] : '-',
+            effective_score: pick >= 0 ? data.bot_scores[ball][delivery] : '-'
+        },
+        allScores: allScores
+    };
+}
+
 function displayBattingScores(botChoice, allScores) {
     // Display bot's bowling choice
     const botChoiceDiv = document.getElementById('botChoice');
@@ -291,15 +425,16 @@ function displayBowlingScores(botChoice, allScores) {
         // Highlight bot's choice
         const isBotChoice = score.name === botChoice.shot;
         
-        // Color code by runs
+        // Color code by expected runs, wicket chance wins when it is likely
+        const wicketChance = score.distribution ? score.distribution.W : 0;
         let runsColor = '#666';
-        if (score.expected_runs === 6) runsColor = '#4CAF50'; // Green - 6 runs
-        else if (score.expected_runs === 4) runsColor = '#2196F3'; // Blue - 4 runs
-        else if (score.expected_runs === 2) runsColor = '#FF9800'; // Orange - 2 runs
-        else if (score.expected_runs === 1) runsColor = '#9C27B0'; // Purple - 1 run
-        else if (score.expected_runs === 'W') runsColor = '#f44336'; // Red - Wicket
+        if (wicketChance >= 0.5) runsColor = '#f44336'; // Red - Likely wicket
+        else if (score.expected_runs >= 5.5) runsColor = '#4CAF50'; // Green - 6 runs
+        else if (score.expected_runs >= 3.5) runsColor = '#2196F3'; // Blue - 4 runs
+        else if (score.expected_runs >= 1.5) runsColor = '#FF9800'; // Orange - 2 runs
         
-        const runsText = score.expected_runs === 'W' ? 'WICKET' : score.expected_runs + ' Runs';
+        let runsText = score.expected_runs.toFixed(2) + ' Runs';
+        if (wicketChance > 0) runsText += ` · W ${Math.round(wicketChance * 100)}%`;
         
         scoreItem.innerHTML = `
             <div style="display: flex; justify-content: space-between; align-items: center; ${isBotChoice ? 'background: rgba(0,0,0,0.1); padding: 8px; border-radius: 8px; border: 2px solid #4CAF50;' : ''}">
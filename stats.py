@@ -0,0 +1,194 @@
+from array import array
+
+import numpy as np
+
+from combinations import COMBINATIONS
+from shot import OUTCOMES
+from teams import TEAMS
+
+BATTING = ("runs", "balls", "outs", "dots", "fours", "sixes")
+BOWLING = ("balls", "runs", "wickets", "dots")
+
+# Column of each result in the per-delivery counters
+RESULT_COLUMN = {result: i for i, result in enumerate(OUTCOMES)}
+RESULT_RUNS = np.array([0 if r == "W" else r for r in OUTCOMES])
+
+# Batting counter bumped by a scoring result besides runs and balls
+RESULT_BATTING_COLUMN = {0: BATTING.index("dots"), 4: BATTING.index("fours"),
+                         6: BATTING.index("sixes")}
+
+
+# ----------------------------
+# Stats Aggregator
+# ----------------------------
+class MatchStats:
+    """Running player and delivery counters, updated once per ball.
+
+    Every player of `teams` owns a row in the batting and bowling arrays
+    and every delivery combination a row of outcome counts, so adding a
+    ball touches a handful of cells and queries never replay history.
+    Counters are flat int32 buffers, cheap to bump from Python, and the
+    queries read them through numpy views without copying. Aggregators of
+    the same teams add up with merge().
+
+    `combinations` only sizes the delivery counters and is not kept, so an
+    aggregator pickles as its counters alone. Pass the same index to
+    add_ball and delivery_summary.
+    """
+
+    def __init__(self, teams=TEAMS, combinations=COMBINATIONS):
+        self.players = []
+        self.slot = {}
+        self.team_slots = {}
+        for code, squad in teams.items():
+            start = len(self.players)
+            for player in squad:
+                self.slot[player["name"]] = len(self.players)
+                self.players.append((code, player["name"]))
+            self.team_slots[code] = range(start, len(self.players))
+
+        self._batting = array("i", bytes(4 * len(self.players) * len(BATTING)))
+        self._bowling = array("i", bytes(4 * len(self.players) * len(BOWLING)))
+        self._deliveries = array("i", bytes(4 * len(combinations) * len(OUTCOMES)))
+        self.balls = 0
+
+    @property
+    def batting(self):
+        return np.frombuffer(self._batting, dtype=np.int32).reshape(-1, len(BATTING))
+
+    @property
+    def bowling(self):
+        return np.frombuffer(self._bowling, dtype=np.int32).reshape(-1, len(BOWLING))
+
+    @property
+    def deliveries(self):
+        return np.frombuffer(self._deliveries, dtype=np.int32).reshape(-1, len(OUTCOMES))
+
+    def add_ball(self, batsman, bowler, delivery, result, combinations=COMBINATIONS):
+        """Count one ball, `delivery` is (bowling_type, line, length, variation)"""
+        bat = self.slot[batsman] * len(BATTING)
+        bowl = self.slot[bowler] * len(BOWLING)
+        batting = self._batting
+        bowling = self._bowling
+
+        batting[bat + 1] += 1
+        bowling[bowl] += 1
+        if result == "W":
+            batting[bat + 2] += 1
+            bowling[bowl + 2] += 1
+        else:
+            batting[bat] += result
+            bowling[bowl + 1] += result
+            if result in RESULT_BATTING_COLUMN:
+                batting[bat + RESULT_BATTING_COLUMN[result]] += 1
+            if result == 0:
+                bowling[bowl + 3] += 1
+
+        self._deliveries[combinations.index[tuple(delivery)] * len(OUTCOMES) +
+                         RESULT_COLUMN[result]] += 1
+        self.balls += 1
+
+    def on_ball(self, ball):
+        """MatchEngine on_ball hook"""
+        self.add_ball(ball["batsman"]["name"], ball["bowler"]["name"],
+                      (ball["bowling_type"], ball["line"], ball["length"], ball["variation"]),
+                      ball["result"])
+
+    def merge(self, other):
+        batting, bowling, deliveries = self.batting, self.bowling, self.deliveries
+        batting += other.batting
+        bowling += other.bowling
+        deliveries += other.deliveries
+        self.balls += other.balls
+        return self
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def batting_line(self, i):
+        runs, balls, outs, dots, fours, sixes = (int(v) for v in self.batting[i])
+        return {
+            "name": self.players[i][1],
+            "runs": runs,
+            "balls": balls,
+            "outs": outs,
+            "fours": fours,
+            "sixes": sixes,
+            "dots": dots,
+            "strike_rate": round(100 * runs / balls, 2) if balls else None,
+            "average": round(runs / outs, 2) if outs else None
+        }
+
+    def bowling_line(self, i):
+        balls, runs, wickets, dots = (int(v) for v in self.bowling[i])
+        return {
+            "name": self.players[i][1],
+            "overs": f"{balls // 6}.{balls % 6}",
+            "balls": balls,
+            "runs": runs,
+            "wickets": wickets,
+            "dots": dots,
+            "economy": round(6 * runs / balls, 2) if balls else None
+        }
+
+    def scorecard(self, code):
+        """Batting and bowling figures of one team, players who took part only"""
+        slots = self.team_slots[code]
+        return {
+            "team": code,
+            "batting": [self.batting_line(i) for i in slots if self.batting[i, 1]],
+            "bowling": [self.bowling_line(i) for i in slots if self.bowling[i, 0]]
+        }
+
+    def leaderboard(self, stat="runs", limit=10, min_balls=0):
+        """Top players by runs, wickets, strike_rate or economy.
+
+        Rate stats only rank players with at least `min_balls` faced or
+        bowled. Economy ranks lowest first.
+        """
+        if stat == "runs":
+            key, balls = self.batting[:, 0], self.batting[:, 1]
+            lines = self.batting_line
+        elif stat == "strike_rate":
+            balls = self.batting[:, 1]
+            key = 100 * self.batting[:, 0] / np.maximum(balls, 1)
+            lines = self.batting_line
+        elif stat == "wickets":
+            key, balls = self.bowling[:, 2], self.bowling[:, 0]
+            lines = self.bowling_line
+        elif stat == "economy":
+            balls = self.bowling[:, 0]
+            key = -6 * self.bowling[:, 1] / np.maximum(balls, 1)
+            lines = self.bowling_line
+        else:
+            raise ValueError(f"Unknown stat: {stat}")
+
+        eligible = np.flatnonzero((balls > 0) & (balls >= min_balls))
+        ranked = eligible[np.argsort(-key[eligible], kind="stable")[:limit]]
+        return [{"team": self.players[i][0], **lines(i)} for i in ranked]
+
+    def delivery_summary(self, bowling_type=None, combinations=COMBINATIONS):
+        """Balls, runs and wickets per bowling type, or per delivery of one type"""
+        if bowling_type is None:
+            groups = {bowling_type: self.deliveries[start:end].sum(0)
+                      for bowling_type, (start, end) in combinations.type_ranges.items()}
+        else:
+            groups = {c[1:]: self.deliveries[combinations.index[c]]
+                      for c in combinations.by_type[bowling_type]}
+
+        summary = []
+        for key, counts in groups.items():
+            balls = int(counts.sum())
+            if not balls:
+                continue
+            runs = int(counts @ RESULT_RUNS)
+            wickets = int(counts[RESULT_COLUMN["W"]])
+            summary.append({
+                "delivery": key if isinstance(key, str) else dict(zip(("line", "length", "variation"), key)),
+                "balls": balls,
+                "runs": runs,
+                "wickets": wickets,
+                "economy": round(6 * runs / balls, 2),
+                "wicket_percentage": round(100 * wickets / balls, 2)
+            })
+        return summary
@@ -0,0 +1,43 @@
+import json
+import os
+
+SQUADS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "squads.json")
+
+
+# ----------------------------
+# TEAM DATA
+# ----------------------------
+def load_squads(path=SQUADS_PATH):
+    """Squad registry: {code: {"name": ..., "players": [...]}} in file order"""
+    with open(path, encoding="utf-8") as f:
+        squads = json.load(f)
+
+    seen = set()
+    for code, squad in squads.items():
+        players = squad["players"]
+        if len(players) < 11:
+            raise ValueError(f"{code} needs 11 players, has {len(players)}")
+        if not any(p["bowl"] > 0 for p in players):
+            raise ValueError(f"{code} has no bowlers")
+        # Stats and commentary identify players by name alone
+        for p in players:
+            if p["name"] in seen:
+                raise ValueError(f"{p['name']} is in more than one squad")
+            seen.add(p["name"])
+
+    return squads
+
+
+SQUADS = load_squads()
+
+# Batting order is the squad order
+TEAMS = {code: squad["players"] for code, squad in SQUADS.items()}
+
+CSK_PLAYERS = TEAMS["CSK"]
+MI_PLAYERS = TEAMS["MI"]
+
+
+def get_bowling_order(team):
+    """Bowlers of a team, best first, in the order they rotate overs"""
+    return sorted([p for p in team if p["bowl"] > 0],
+                  key=lambda x: x["bowl"], reverse=True)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules load the workbook by its relative path at import time
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+# No rating watcher thread and no matches.db from the app under test
+os.environ.setdefault("RATINGS_RELOAD_INTERVAL", "0")
+os.environ.setdefault("MATCH_STORE", "memory")
@@ -0,0 +1,70 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from rating_blocks import BlockRatingStore, import_ratings, is_block_file, read_block_source
+from ratings import RatingStore, load_compiled, source_stamp
+from shot import FILE_PATH
+
+
+@pytest.fixture(scope="module")
+def dense():
+    return RatingStore.from_xlsx(FILE_PATH)
+
+
+@pytest.fixture(scope="module", params=[{}, {"block_rows": 5, "max_buffered_rows": 12}],
+                ids=["default", "small-blocks"])
+def blocks(request, tmp_path_factory):
+    # Small blocks and a small buffer force splitting and early flushes
+    path = str(tmp_path_factory.mktemp("blocks") / "ratings.ratings")
+    import_ratings(FILE_PATH, path, **request.param)
+    return BlockRatingStore(path)
+
+
+def in_order_of(store, like):
+    """store.cube with its axes reordered to like's vocabularies"""
+    index = [[getattr(store, name).index(value) for value in getattr(like, name)]
+             for name in ("bowling_types", "lines", "lengths", "variations", "shots")]
+    return store.cube[np.ix_(*index)]
+
+
+def test_block_file_round_trips_to_the_dense_cube(blocks, dense):
+    for name in ("bowling_types", "lines", "lengths", "variations", "shots"):
+        assert sorted(getattr(blocks, name)) == sorted(getattr(dense, name))
+    assert {sheet: {key: sorted(values) for key, values in vocab.items()}
+            for sheet, vocab in blocks.sheets.items()} == \
+           {sheet: {key: sorted(values) for key, values in vocab.items()}
+            for sheet, vocab in dense.sheets.items()}
+    np.testing.assert_array_equal(in_order_of(blocks, dense), dense.cube)
+
+
+def test_block_lookups_match_dense(blocks, dense):
+    for sheet, vocab in dense.sheets.items():
+        for line in vocab["lines"]:
+            for length in vocab["lengths"]:
+                for variation in vocab["variations"]:
+                    try:
+                        shots, expected = dense.shot_vector(sheet, line, length, variation)
+                    except ValueError:
+                        with pytest.raises(ValueError):
+                            blocks.shot_vector(sheet, line, length, variation)
+                        continue
+
+                    block_shots, ratings = blocks.shot_vector(sheet, line, length, variation)
+                    assert dict(zip(block_shots, ratings)) == dict(zip(shots, expected))
+                    shot = shots[0]
+                    assert (blocks.rating(sheet, line, length, variation, shot) ==
+                            dense.rating(sheet, line, length, variation, shot))
+
+
+def test_block_file_is_found_and_stamped(blocks):
+    assert is_block_file(blocks.path)
+    assert read_block_source(blocks.path) == source_stamp(FILE_PATH)
+    assert isinstance(load_compiled(blocks.path), BlockRatingStore)
+
+
+def test_block_store_pickles_by_path(blocks, dense):
+    copy = pickle.loads(pickle.dumps(blocks))
+    assert copy.path == blocks.path and copy.digest == blocks.digest
+    np.testing.assert_array_equal(in_order_of(copy, dense), dense.cube)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from openpyxl import load_workbook
+
+from ratings import RatingStore, is_binary_fresh, load_compiled, read_source, source_stamp
+from shot import FILE_PATH
+
+
+@pytest.fixture(scope="module")
+def store():
+    return RatingStore.from_xlsx(FILE_PATH)
+
+
+def test_lookups_match_workbook_cells(store):
+    wb = load_workbook(FILE_PATH, read_only=True)
+    for sheet in wb.sheetnames:
+        rows = wb[sheet].iter_rows(values_only=True)
+        shots = next(rows)[3:]
+        for line, length, variation, *ratings in rows:
+            for shot, rating in zip(shots, ratings):
+                if rating:
+                    assert store.rating(sheet, line, length, variation, shot) == rating
+
+
+def test_unknown_delivery_raises(store):
+    with pytest.raises(ValueError):
+        store.shot_vector("Fast", "Nowhere", "Yorker", "Normal")
+
+
+def assert_same_store(loaded, store):
+    for name in ("bowling_types", "lines", "lengths", "variations", "shots", "sheets"):
+        assert getattr(loaded, name) == getattr(store, name)
+    np.testing.assert_array_equal(loaded.cube, store.cube)
+
+
+def test_save_load_round_trip(store, tmp_path):
+    path = str(tmp_path / "ratings.ratings")
+    store.save(path)
+    assert_same_store(RatingStore.load(path), store)
+
+
+def test_compiled_file_tracks_its_workbook(store, tmp_path):
+    path = str(tmp_path / "ratings.ratings")
+    store.save(path, source_path=FILE_PATH)
+    assert read_source(path) == source_stamp(FILE_PATH)
+    assert is_binary_fresh(FILE_PATH, path)
+    assert_same_store(load_compiled(path), store)
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+import replay
+from app import app
+from shot import OUTCOMES
+
+
+def play_match(decision, overs=1, seed=0):
+    """Play a whole match through the web routes, returns (client, target, runs)"""
+    rng = random.Random(seed)
+    client = app.test_client()
+    client.post("/toss", data={"team": "CSK", "overs": str(overs), "mode": "medium"})
+    assert client.post("/start", data={"decision": decision}).status_code == 200
+
+    sheet = client.get("/get_sheet_data/Fast").get_json()
+    for _ in range(4 * overs * 6):
+        page = client.post("/play_ball", data={
+            "shot": rng.choice(sheet["shots"]),
+            "bowling_type": "Fast",
+            "line": rng.choice(sheet["lines"]),
+            "length": rng.choice(sheet["lengths"]),
+            "variation": rng.choice(sheet["variations"])
+        })
+        assert page.status_code == 200
+        if b"Final Score" in page.data:
+            break
+    else:
+        pytest.fail("match did not finish")
+
+    with client.session_transaction() as session:
+        return client, session["target"], session["runs"]
+
+
+def innings_runs(results, innings, records):
+    runs = np.array([0, 2, 4, 6, 0])[results]
+    return int(runs[records["innings"] == innings].sum())
+
+
+@pytest.mark.parametrize("decision", replay.DECISIONS)
+def test_resimulated_log_reproduces_the_match(decision):
+    client, target, runs = play_match(decision)
+    header, records = replay.read_log(client.get("/replay").data)
+    assert header["decision"] == decision
+    assert len(records) and set(records["innings"]) == {1, 2}
+
+    effective, result = replay.resimulate(records)
+    np.testing.assert_array_equal(effective, records["effective"])
+    np.testing.assert_array_equal(result, records["result"])
+    assert innings_runs(result, 1, records) == target - 1
+    assert innings_runs(result, 2, records) == runs
+
+
+def test_verify_logs_flags_a_tampered_ball():
+    client, _, _ = play_match("bat", seed=1)
+    log = bytearray(client.get("/replay").data)
+    assert replay.verify_logs([bytes(log)])["mismatched_balls"] == 0
+
+    _, records = replay.read_log(log)
+    first = replay.HEADER.size
+    effective = first + replay.RECORD_DTYPE.fields["effective"][1]
+    log[effective] = (records["effective"][0] % 100) + 1
+    summary = replay.verify_logs([bytes(log)])
+    assert summary["mismatched_logs"] == [0]
+
+
+def test_logs_of_unknown_ratings_are_unverified():
+    log = replay.new_log(1, 1, "medium", "bat", "00" * 6)
+    assert replay.verify_logs([bytes(log)])["unverified_logs"] == [0]
+
+
+def test_new_log_rejects_unknown_decisions():
+    with pytest.raises(ValueError):
+        replay.new_log(1, 1, "medium", "field", "00" * 6)
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from shot import (
+    OUTCOME_EXPECTED_RUNS,
+    OUTCOME_TABLE,
+    OUTCOMES,
+    SHOT_MAX_RUNS,
+    max_runs_class,
+    outcome_distribution,
+    resolve_outcome
+)
+
+
+class FixedRoll:
+    """Stands in for `random`, every randint returns the same roll"""
+
+    def __init__(self, roll):
+        self.roll = roll
+        self.calls = 0
+
+    def randint(self, low, high):
+        self.calls += 1
+        return self.roll
+
+
+def baseline_outcome(effective_score, max_runs, at_stumps, roll):
+    """The outcome rules of the original simulate_ball, ball by ball"""
+    if max_runs == 0:
+        return 0
+    if effective_score >= 98:
+        return 6 if max_runs == 6 else 4
+    if effective_score >= 85:
+        return 4
+    if effective_score >= 75:
+        return 2
+    if at_stumps and roll > effective_score:
+        return "W"
+    return 0
+
+
+CELLS = [(effective_score, max_runs, at_stumps)
+         for effective_score in range(1, 101)
+         for max_runs in (0, 4, 6)
+         for at_stumps in (False, True)]
+
+
+@pytest.mark.parametrize("effective_score,max_runs,at_stumps", CELLS)
+def test_resolve_outcome_matches_baseline(effective_score, max_runs, at_stumps):
+    for roll in range(1, 101):
+        rng = FixedRoll(roll)
+        assert (resolve_outcome(effective_score, max_runs, at_stumps, rng) ==
+                baseline_outcome(effective_score, max_runs, at_stumps, roll))
+        # The baseline only rolled for low scoring attacking shots at the stumps
+        expects_roll = max_runs != 0 and effective_score < 75 and at_stumps
+        assert rng.calls == int(expects_roll)
+
+
+@pytest.mark.parametrize("effective_score,max_runs,at_stumps", CELLS)
+def test_outcome_table_is_baseline_distribution(effective_score, max_runs, at_stumps):
+    counts = dict.fromkeys(OUTCOMES, 0)
+    for roll in range(1, 101):
+        counts[baseline_outcome(effective_score, max_runs, at_stumps, roll)] += 1
+
+    cell = OUTCOME_TABLE[effective_score, max_runs_class(max_runs), int(at_stumps)]
+    assert cell.sum() == pytest.approx(1)
+    for outcome, p in zip(OUTCOMES, cell):
+        assert p == pytest.approx(counts[outcome] / 100)
+
+    expected_runs = sum(outcome * n for outcome, n in counts.items() if outcome != "W") / 100
+    assert OUTCOME_EXPECTED_RUNS[effective_score, max_runs_class(max_runs),
+                                 int(at_stumps)] == pytest.approx(expected_runs)
+
+
+def test_outcome_distribution_keys_match_results():
+    distribution = outcome_distribution(60, "Off Stump", "Yorker", "Pull")
+    assert distribution == pytest.approx({"0": 0.6, "2": 0, "4": 0, "6": 0, "W": 0.4})
+
+
+def test_every_shot_has_a_max_runs_class():
+    for shot, max_runs in SHOT_MAX_RUNS.items():
+        assert max_runs_class(max_runs) == {0: 0, 4: 1, 6: 2}[max_runs]
+
+
+def test_resolve_outcome_uses_module_random_by_default():
+    random.seed(7)
+    first = [resolve_outcome(40, 4, True) for _ in range(50)]
+    random.seed(7)
+    assert [resolve_outcome(40, 4, True) for _ in range(50)] == first
@@ -0,0 +1,53 @@
+import pytest
+
+import shot_engine
+
+
+@pytest.fixture
+def rated(monkeypatch):
+    """Give every delivery the same shot rating"""
+    def set_rating(rating):
+        monkeypatch.setattr(shot_engine, "get_shot_rating", lambda *args: rating)
+    return set_rating
+
+
+def play(shot_type, line="Off Stump", length="Yorker", batsman=100, bowler=0, roll=100):
+    class Roll:
+        def randint(self, low, high):
+            return roll
+
+    return shot_engine.simulate_ball(batsman, bowler, "Fast", line, length, "Normal",
+                                     shot_type, Roll())
+
+
+@pytest.mark.parametrize("shot_type,runs", [("Pull", 6), ("Cover Drive", 4)])
+def test_very_high_scores_are_boundaries(rated, shot_type, runs):
+    rated(100)
+    assert play(shot_type) == {"Result": runs, "Type": "BOUNDARY"}
+
+
+def test_high_medium_and_low_scores(rated):
+    # 0.8 * rating + 0.4 * 100 batsman
+    rated(70)
+    assert play("Pull") == {"Result": 4, "Type": "FOUR"}
+    rated(50)
+    assert play("Pull") == {"Result": 2, "Type": "TWO"}
+    rated(10)
+    assert play("Pull", roll=1) == {"Result": 0, "Type": "DOT"}
+    assert play("Pull", roll=100) == {"Result": "W", "Type": "WICKET"}
+    assert play("Pull", line="Wide Outside Off", roll=100) == {"Result": 0, "Type": "DOT"}
+
+
+def test_defensive_shots_are_dots(rated):
+    rated(100)
+    assert play("Defense") == {"Result": 0, "Type": "DOT"}
+    rated(1)
+    assert play("Leave", roll=100) == {"Result": 0, "Type": "DOT"}
+
+
+def test_reads_real_ratings():
+    data = shot_engine.get_dropdown_data()
+    sheet = data["Fast"]
+    result = shot_engine.simulate_ball(80, 70, "Fast", sheet["lines"][0], sheet["lengths"][0],
+                                       sheet["variations"][0], sheet["shots"][0])
+    assert result["Type"] in ("DOT", "TWO", "FOUR", "BOUNDARY", "WICKET")
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from itertools import product
+
+from ratings import source_stamp
+
+TOSS_PAYOFFS_PATH = os.environ.get(
+    "TOSS_PAYOFFS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "toss_payoffs.json")
+)
+
+# How often lookups check the payoff file for changes, in seconds
+RELOAD_INTERVAL = 1.0
+
+# The toss form's dropdowns, in the order their payoffs are summed
+CONDITIONS = {
+    "time": ("Afternoon Match", "Night Match"),
+    "pitch": ("Dry Pitch", "Green Pitch"),
+    "ground": ("Small Ground", "Large Ground"),
+    "dew": ("High Dew", "No Dew"),
+    "rain": ("Rain Affected", "No Rain"),
+    "humidity": ("High Humidity", "Normal Humidity"),
+    "turn": ("Slow Turning Pitch", "Fast Pitch")
+}
+
+
+# ----------------------------
+# Toss Decision
+# ----------------------------
+def load_payoffs(path=TOSS_PAYOFFS_PATH):
+    """{condition: (bat, bowl)} payoff matrix from a JSON file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {condition: (bat, bowl) for condition, (bat, bowl) in data.items()}
+
+
+def evaluate(conditions, toss_won, payoffs):
+    """(bat %, bowl %, "BAT" or "BOWL") for a list of condition values"""
+    bat_total = 0
+    bowl_total = 0
+    for cond in conditions:
+        if cond in payoffs:
+            bat, bowl = payoffs[cond]
+            bat_total += bat
+            bowl_total += bowl
+
+    bat_prob = bat_total / len(conditions)
+    bowl_prob = bowl_total / len(conditions)
+
+    # Apply bonuses for pitch knowledge
+    time_, pitch, ground, dew, rain, humidity, turn = (c or "" for c in conditions)
+    if "Dry" in pitch or "Slow" in turn:
+        bat_prob += 5
+    if "Green" in pitch or "High Dew" in dew:
+        bowl_prob += 5
+
+    # Toss advantage
+    if toss_won:
+        if bat_prob > bowl_prob:
+            bat_prob += 3
+        else:
+            bowl_prob += 3
+
+    total = bat_prob + bowl_prob
+    return (
+        round((bat_prob / total) * 100, 1),
+        round((bowl_prob / total) * 100, 1),
+        "BAT" if bat_prob > bowl_prob else "BOWL"
+    )
+
+
+def build_table(payoffs):
+    """Decision for every combination of the dropdowns and both toss results"""
+    return {
+        (*conditions, toss_won): evaluate(conditions, toss_won, payoffs)
+        for conditions in product(*CONDITIONS.values())
+        for toss_won in (True, False)
+    }
+
+
+# ----------------------------
+# Toss Model
+# ----------------------------
+class TossModel:
+    """Precomputed toss decisions, rebuilt when the payoff file changes.
+
+    A lookup is one dict access. At most once every RELOAD_INTERVAL it
+    also stats the payoff file, and a changed file is loaded into a new
+    table that replaces the old one in a single assignment. A file that
+    fails to load keeps the previous table.
+    """
+
+    def __init__(self, path=TOSS_PAYOFFS_PATH, reload_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.stamp = source_stamp(path)
+        self.payoffs = load_payoffs(path)
+        self.table = build_table(self.payoffs)
+        self.next_check = time.monotonic() + reload_interval
+
+    def refresh(self):
+        now = time.monotonic()
+        if now < self.next_check or not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.next_check = now + self.reload_interval
+            stamp = source_stamp(self.path)
+            if stamp != self.stamp:
+                payoffs = load_payoffs(self.path)
+                self.payoffs, self.table = payoffs, build_table(payoffs)
+                self.stamp = stamp
+        except (OSError, ValueError, TypeError):
+            pass
+        finally:
+            self.lock.release()
+
+    def decide(self, conditions, toss_won):
+        """(bat %, bowl %, decision) for condition values in CONDITIONS order"""
+        self.refresh()
+        decision = self.table.get((*conditions, toss_won))
+        if decision is None:
+            # Values outside the dropdowns, worked out the long way
+            decision = evaluate(conditions, toss_won, self.payoffs)
+        return decision
+
+    def rows(self):
+        """The whole table, one dict per combination"""
+        self.refresh()
+        return [{
+            **dict(zip(CONDITIONS, key[:-1])),
+            "toss_won": key[-1],
+            "bat_percentage": bat,
+            "bowl_percentage": bowl,
+            "decision": decision
+        } for key, (bat, bowl, decision) in self.table.items()]
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Print the toss decision for every condition combination")
+    parser.add_argument("--payoffs", default=TOSS_PAYOFFS_PATH)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    rows = TossModel(args.payoffs).rows()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+    else:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import random
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+from match_engine import BatchEngine, WEAK_SHOT_PERCENTAGE
+from teams import SQUADS, TEAMS
+
+FORMATS = ("ipl", "round-robin")
+
+PLAYER_STATS = ("bat_runs", "bat_balls", "bat_outs",
+                "bowl_balls", "bowl_runs", "bowl_wickets")
+
+
+# ----------------------------
+# Fixtures
+# ----------------------------
+def round_robin(team_count, legs=2):
+    """Every pair meets `legs` times, home and away alternating"""
+    fixtures = []
+    for leg in range(legs):
+        for a in range(team_count):
+            for b in range(a + 1, team_count):
+                fixtures.append((a, b) if leg % 2 == 0 else (b, a))
+    return fixtures
+
+
+def ipl_league(team_count):
+    """IPL league stage: two groups, 14 games a team.
+
+    Teams play their own group twice, the team in the same position of
+    the other group twice and the rest of that group once. Ten teams give
+    the 70 league games of a 74 match season.
+    """
+    if team_count % 2:
+        raise ValueError("The IPL format needs an even number of teams")
+
+    half = team_count // 2
+    groups = (list(range(half)), list(range(half, team_count)))
+    fixtures = []
+    for group in groups:
+        for i, a in enumerate(group):
+            for b in group[i + 1:]:
+                fixtures += [(a, b), (b, a)]
+
+    for i, a in enumerate(groups[0]):
+        for j, b in enumerate(groups[1]):
+            fixtures += [(a, b), (b, a)] if i == j else [(a, b) if (i + j) % 2 else (b, a)]
+    return fixtures
+
+
+def league_fixtures(fmt, team_count):
+    if fmt == "ipl":
+        return ipl_league(team_count)
+    if fmt == "round-robin":
+        return round_robin(team_count)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+# ----------------------------
+# Season Simulation
+# ----------------------------
+def new_totals(team_count, squad_size):
+    totals = {key: np.zeros(team_count, dtype=np.int64)
+              for key in ("points", "wins", "losses", "ties", "position",
+                          "playoffs", "finals", "titles")}
+    totals["nrr"] = np.zeros(team_count)
+    totals["players"] = {key: np.zeros((team_count, squad_size), dtype=np.int64)
+                         for key in PLAYER_STATS}
+    totals["seasons"] = 0
+    return totals
+
+
+def play_fixtures(engine, home, away, higher_seed=None):
+    """Toss for who bats first, play, and settle knockout ties on seeding"""
+    bat_home = engine.rng.random(len(home)) < 0.5
+    batting_first = np.where(bat_home, home, away)
+    bowling_first = np.where(bat_home, away, home)
+    result = engine.play(batting_first, bowling_first)
+    result["batting_first"] = batting_first
+    result["bowling_first"] = bowling_first
+    if higher_seed is not None:
+        result["winner"] = np.where(result["tie"], higher_seed, result["winner"])
+    return result
+
+
+def add_player_stats(totals, result):
+    for innings, batting, bowling in (
+            ("first_innings", "batting_first", "bowling_first"),
+            ("second_innings", "bowling_first", "batting_first")):
+        stats = result[innings]
+        for key in PLAYER_STATS:
+            team = result[batting] if key.startswith("bat") else result[bowling]
+            np.add.at(totals["players"][key], team, stats[key])
+
+
+def simulate_seasons(seasons, fmt="ipl", overs=20, mode="medium", seed=None,
+                     detail=False):
+    """Play `seasons` full seasons (league and playoffs) in one batch"""
+    engine = BatchEngine(TEAMS, overs, mode, seed)
+    team_count = len(engine.codes)
+    fixtures = np.array(league_fixtures(fmt, team_count))
+    totals = new_totals(team_count, engine.squad_size)
+    season_rows = np.arange(seasons)
+
+    # League: every fixture of every season in one go
+    season = np.repeat(season_rows, len(fixtures))
+    home = np.tile(fixtures[:, 0], seasons)
+    away = np.tile(fixtures[:, 1], seasons)
+    league = play_fixtures(engine, home, away)
+    add_player_stats(totals, league)
+
+    points = np.zeros((seasons, team_count), dtype=np.int64)
+    wins = np.zeros_like(points)
+    ties = np.zeros_like(points)
+    runs_for = np.zeros_like(points)
+    runs_against = np.zeros_like(points)
+    balls_faced = np.zeros_like(points)
+    balls_bowled = np.zeros_like(points)
+
+    tie = league["tie"]
+    np.add.at(points, (season[~tie], league["winner"][~tie]), 2)
+    np.add.at(wins, (season[~tie], league["winner"][~tie]), 1)
+    for team in (home[tie], away[tie]):
+        np.add.at(points, (season[tie], team), 1)
+        np.add.at(ties, (season[tie], team), 1)
+
+    for innings, batting, bowling in (
+            ("first_innings", "batting_first", "bowling_first"),
+            ("second_innings", "bowling_first", "batting_first")):
+        stats = league[innings]
+        # A side bowled out is charged its full quota of overs
+        balls = np.where(stats["wickets"] >= 10, overs * 6, stats["balls"])
+        np.add.at(runs_for, (season, league[batting]), stats["runs"])
+        np.add.at(balls_faced, (season, league[batting]), balls)
+        np.add.at(runs_against, (season, league[bowling]), stats["runs"])
+        np.add.at(balls_bowled, (season, league[bowling]), balls)
+
+    nrr = (6 * runs_for / np.maximum(balls_faced, 1) -
+           6 * runs_against / np.maximum(balls_bowled, 1))
+    standings = np.lexsort((-nrr, -points), axis=-1)
+    position = np.argsort(standings, axis=-1)
+
+    # Playoffs: Q1 1v2, Eliminator 3v4, Q2 loser Q1 v winner Eliminator, Final
+    top = standings[:, :4]
+    first_round = play_fixtures(engine, np.concatenate([top[:, 0], top[:, 2]]),
+                                np.concatenate([top[:, 1], top[:, 3]]),
+                                np.concatenate([top[:, 0], top[:, 2]]))
+    q1_winner = first_round["winner"][:seasons]
+    q1_loser = np.where(q1_winner == top[:, 0], top[:, 1], top[:, 0])
+    eliminator_winner = first_round["winner"][seasons:]
+    q2 = play_fixtures(engine, q1_loser, eliminator_winner, q1_loser)
+    final = play_fixtures(engine, q1_winner, q2["winner"], q1_winner)
+    for result in (first_round, q2, final):
+        add_player_stats(totals, result)
+
+    totals["seasons"] = seasons
+    totals["points"] += points.sum(0)
+    totals["wins"] += wins.sum(0)
+    totals["ties"] += ties.sum(0)
+    totals["losses"] += seasons * np.bincount(fixtures.ravel(), minlength=team_count) - wins.sum(0) - ties.sum(0)
+    totals["position"] += (position + 1).sum(0)
+    totals["nrr"] += nrr.sum(0)
+    np.add.at(totals["playoffs"], top.ravel(), 1)
+    np.add.at(totals["finals"], np.concatenate([q1_winner, q2["winner"]]), 1)
+    np.add.at(totals["titles"], final["winner"], 1)
+
+    if detail:
+        played = np.bincount(fixtures.ravel(), minlength=team_count)
+        totals["table"] = [{
+            "team": engine.codes[t],
+            "played": int(played[t]),
+            "won": int(wins[0, t]),
+            "lost": int(played[t] - wins[0, t] - ties[0, t]),
+            "tied": int(ties[0, t]),
+            "points": int(points[0, t]),
+            "nrr": round(float(nrr[0, t]), 3)
+        } for t in standings[0]]
+        totals["playoff_results"] = {
+            "qualifier_1": engine.codes[q1_winner[0]],
+            "eliminator": engine.codes[eliminator_winner[0]],
+            "qualifier_2": engine.codes[q2["winner"][0]],
+            "final": engine.codes[final["winner"][0]]
+        }
+    return totals
+
+
+def _simulate_chunk(args):
+    return simulate_seasons(*args)
+
+
+def merge_totals(chunks):
+    total = chunks[0]
+    for chunk in chunks[1:]:
+        total["seasons"] += chunk["seasons"]
+        for key, value in chunk.items():
+            if key == "players":
+                for stat, array in value.items():
+                    total["players"][stat] += array
+            elif isinstance(value, np.ndarray):
+                total[key] += value
+    return total
+
+
+def run_tournament(seasons=1, fmt="ipl", overs=20, mode="medium", workers=None,
+                   seed=None, chunk_size=250):
+    """Spread seasons over a process pool and summarise teams and players"""
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    chunks = []
+    remaining = seasons
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        chunks.append((count, fmt, overs, mode, base_seed + len(chunks), seasons == 1))
+        remaining -= count
+
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(_simulate_chunk, chunks)
+    else:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+
+    return summarise(merge_totals(results), fmt, overs, mode, base_seed)
+
+
+# ----------------------------
+# Report
+# ----------------------------
+def summarise(totals, fmt, overs, mode, seed):
+    seasons = totals["seasons"]
+    codes = list(TEAMS)
+
+    teams = sorted(({
+        "team": code,
+        "name": SQUADS[code]["name"],
+        "avg_points": round(totals["points"][t] / seasons, 2),
+        "avg_nrr": round(totals["nrr"][t] / seasons, 3),
+        "avg_position": round(totals["position"][t] / seasons, 2),
+        "playoff_pct": round(100 * totals["playoffs"][t] / seasons, 1),
+        "final_pct": round(100 * totals["finals"][t] / seasons, 1),
+        "title_pct": round(100 * totals["titles"][t] / seasons, 1)
+    } for t, code in enumerate(codes)), key=lambda row: row["avg_position"])
+
+    stats = totals["players"]
+    players = []
+    for t, code in enumerate(codes):
+        for slot, player in enumerate(TEAMS[code]):
+            runs = int(stats["bat_runs"][t, slot])
+            balls = int(stats["bat_balls"][t, slot])
+            outs = int(stats["bat_outs"][t, slot])
+            bowled = int(stats["bowl_balls"][t, slot])
+            conceded = int(stats["bowl_runs"][t, slot])
+            players.append({
+                "name": player["name"],
+                "team": code,
+                "runs_per_season": round(runs / seasons, 1),
+                "batting_average": round(runs / outs, 2) if outs else None,
+                "strike_rate": round(100 * runs / balls, 1) if balls else None,
+                "wickets_per_season": round(int(stats["bowl_wickets"][t, slot]) / seasons, 2),
+                "economy": round(6 * conceded / bowled, 2) if bowled else None
+            })
+
+    summary = {
+        "format": fmt,
+        "seasons": seasons,
+        "matches": seasons * (len(league_fixtures(fmt, len(codes))) + 4),
+        "overs": overs,
+        "mode": mode,
+        "seed": seed,
+        "teams": teams,
+        "top_run_scorers": sorted(players, key=lambda p: -p["runs_per_season"])[:10],
+        "top_wicket_takers": sorted(players, key=lambda p: -p["wickets_per_season"])[:10]
+    }
+    if "table" in totals:
+        summary["table"] = totals["table"]
+        summary["playoff_results"] = totals["playoff_results"]
+    return summary
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Simulate whole seasons between every squad")
+    parser.add_argument("-n", "--seasons", type=int, default=1)
+    parser.add_argument("--format", choices=FORMATS, default="ipl")
+    parser.add_argument("--overs", type=int, default=20)
+    parser.add_argument("--mode", choices=sorted(WEAK_SHOT_PERCENTAGE), default="medium")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = run_tournament(args.seasons, args.format, args.overs, args.mode,
+                             args.workers, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from match_engine import MatchEngine
+
+Z_95 = 1.96
+
+
+# ----------------------------
+# Match State
+# ----------------------------
+def match_state(innings, runs, wickets, balls, target=None, overs=20,
+                mode="medium", batting_first="CSK", bowling_first="MI",
+                weak_shot_balls=None):
+    """Everything needed to continue a match, as plain picklable values"""
+    return {
+        "innings": innings,
+        "runs": runs,
+        "wickets": wickets,
+        "balls": balls,
+        "target": target,
+        "overs": overs,
+        "mode": mode,
+        "batting_first": batting_first,
+        "bowling_first": bowling_first,
+        "weak_shot_balls": list(weak_shot_balls) if weak_shot_balls else None
+    }
+
+
+def state_key(state):
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in state.values()
+    )
+
+
+# ----------------------------
+# Simulation Batches
+# ----------------------------
+def simulate_continuations(state, count, seed):
+    """Play `count` continuations of `state`, returns (batting first wins, ties)"""
+    engine = MatchEngine(
+        state["overs"],
+        state["mode"],
+        state["batting_first"],
+        state["bowling_first"],
+        random.Random(seed)
+    )
+
+    wins = 0
+    ties = 0
+    for _ in range(count):
+        result = engine.play_from(
+            state["innings"],
+            state["runs"],
+            state["wickets"],
+            state["balls"],
+            state["target"],
+            state["weak_shot_balls"]
+        )
+        # The engine names batting first the winner of a tie
+        if result["tie"]:
+            ties += 1
+        elif result["winner"] == state["batting_first"]:
+            wins += 1
+    return wins, ties
+
+
+def wilson_interval(wins, total, z=Z_95):
+    """Wilson score interval for a win proportion"""
+    if total == 0:
+        return 0.0, 1.0
+
+    p = wins / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def make_estimate(state, wins, ties, total, done):
+    """Win probabilities with a tie counted as half a win for each side"""
+    points = wins + ties / 2
+    low, high = wilson_interval(points, total)
+    probability = points / total if total else 0.5
+    return {
+        "simulations": total,
+        "probability": {
+            state["batting_first"]: round(probability, 4),
+            state["bowling_first"]: round(1 - probability, 4)
+        },
+        "tie": round(ties / total, 4) if total else 0.0,
+        "interval": [round(low, 4), round(high, 4)],
+        "done": done
+    }
+
+
+# ----------------------------
+# Streaming Estimator
+# ----------------------------
+def iter_win_probability(state, executor=None, seed=0, batch_size=250,
+                         max_simulations=20000, tolerance=0.01, in_flight=8):
+    """Yield a running estimate after every finished batch.
+
+    Batch i is always seeded with `seed + i` and batches are consumed in
+    submission order, so the sequence of estimates is reproducible no
+    matter how many workers run it. Stops once the 95% interval is within
+    +/- `tolerance` or `max_simulations` have been played. Without an
+    executor the batches run in the calling process.
+    """
+    max_batches = max(1, math.ceil(max_simulations / batch_size))
+    if executor is None:
+        in_flight = 1
+
+    pending = []
+    submitted = 0
+    wins = 0
+    ties = 0
+    total = 0
+
+    def submit():
+        nonlocal submitted
+        batch_seed = seed + submitted
+        if executor:
+            pending.append(executor.submit(simulate_continuations, state,
+                                           batch_size, batch_seed))
+        else:
+            pending.append(batch_seed)
+        submitted += 1
+
+    try:
+        while submitted < min(in_flight, max_batches):
+            submit()
+
+        while pending:
+            batch = pending.pop(0)
+            if executor:
+                batch_wins, batch_ties = batch.result()
+            else:
+                batch_wins, batch_ties = simulate_continuations(state, batch_size, batch)
+            wins += batch_wins
+            ties += batch_ties
+            total += batch_size
+
+            low, high = wilson_interval(wins + ties / 2, total)
+            done = (high - low) / 2 <= tolerance or (
+                submitted >= max_batches and not pending)
+
+            yield make_estimate(state, wins, ties, total, done)
+            if done:
+                return
+
+            if submitted < max_batches:
+                submit()
+    finally:
+        if executor:
+            for batch in pending:
+                batch.cancel()
+
+
+def new_executor(workers=None):
+    # Spawned workers never inherit the web server's threads or locks
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+# ----------------------------
+# Background Service
+# ----------------------------
+class WinProbabilityService:
+    """Runs estimates off the request thread and keeps the latest one per match.
+
+    Requests call latest(match_id, state), which returns whatever has been
+    computed so far for that match. A new state cancels the estimate still
+    running for the match's old one, so the pool only works on states that
+    are being polled. At most `max_matches` are tracked, the match polled
+    least recently is cancelled first.
+    """
+
+    def __init__(self, workers=None, max_matches=64, **options):
+        self.workers = workers
+        self.max_matches = max_matches
+        self.options = options
+        self.executor = None
+        self.matches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def latest(self, match_id, state):
+        key = state_key(state)
+        with self.lock:
+            pending = self.matches.get(match_id)
+            if pending is not None:
+                self.matches.move_to_end(match_id)
+                if pending["key"] == key:
+                    return pending["estimate"]
+                pending["cancelled"].set()
+
+            if self.executor is None:
+                self.executor = new_executor(self.workers)
+
+            pending = {
+                "key": key,
+                "estimate": make_estimate(state, 0, 0, 0, False),
+                "cancelled": threading.Event()
+            }
+            self.matches[match_id] = pending
+            while len(self.matches) > self.max_matches:
+                _, evicted = self.matches.popitem(last=False)
+                evicted["cancelled"].set()
+
+        thread = threading.Thread(target=self._run, args=(pending, state), daemon=True)
+        thread.start()
+        return pending["estimate"]
+
+    def _run(self, pending, state):
+        estimates = iter_win_probability(state, self.executor, **self.options)
+        try:
+            for estimate in estimates:
+                if pending["cancelled"].is_set():
+                    return
+                with self.lock:
+                    pending["estimate"] = estimate
+        except Exception:
+            # Cancel the estimate so the next poll retries on a fresh pool
+            with self.lock:
+                pending["cancelled"].set()
+                pending["key"] = None
+                self.executor = None
+            raise
+        finally:
+            # Batches not started yet are dropped with the generator
+            estimates.close()
+
+
+# ----------------------------
+# COMMAND LINE
+# ----------------------------
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Estimate win probability from a match state")
+    parser.add_argument("--innings", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=0)
+    parser.add_argument("--wickets", type=int, default=0)
+    parser.add_argument("--balls", type=int, default=0)
+    parser.add_argument("--target", type=int)
+    parser.add_argument("--overs", type=int, default=20)
+    parser.add_argument("--mode", default="medium")
+    parser.add_argument("--batting-first", default="CSK")
+    parser.add_argument("--bowling-first", default="MI")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    parser.add_argument("--max-simulations", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.innings == 2 and args.target is None:
+        parser.error("--target is required for the second innings")
+
+    state = match_state(args.innings, args.runs, args.wickets, args.balls,
+                        args.target, args.overs, args.mode,
+                        args.batting_first, args.bowling_first)
+
+    with new_executor(args.workers) as executor:
+        for estimate in iter_win_probability(state, executor, seed=args.seed,
+                                             max_simulations=args.max_simulations,
+                                             tolerance=args.tolerance):
+            print(json.dumps(estimate), flush=True)